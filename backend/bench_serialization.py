@@ -0,0 +1,103 @@
+"""Compare the default and fast JSON paths for the booking read endpoints.
+
+Builds synthetic MongoDB documents and times only the work done after the
+query returns: model construction, response_model validation and encoding.
+
+    python bench_serialization.py --records 10000
+"""
+from datetime import datetime, timedelta
+from typing import List
+import argparse
+import asyncio
+import time
+import uuid
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models import AvailabilityResponse, Booking, TimeSlot
+from responses import FastJSONResponse, to_primitive
+from slots import SLOT_LABELS
+
+
+def make_docs(count: int) -> List[dict]:
+    now = datetime.utcnow()
+    docs = []
+    for i in range(count):
+        booking_id = str(uuid.uuid4())
+        docs.append({
+            "id": booking_id,
+            "reference_number": f"KGG20260101{booking_id[:8].upper()}",
+            "name": f"Customer {i}",
+            "phone": f"+9177025{i:05d}",
+            "email": f"customer{i}@example.com",
+            "game_type": "playstation",
+            "time_slot": SLOT_LABELS[i % len(SLOT_LABELS)],
+            "duration": 60,
+            "num_people": 2,
+            "price": 240.0,
+            "date": (now + timedelta(days=i % 30)).date(),
+            "status": "pending",
+            "special_requests": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+    return docs
+
+
+async def default_path(field, content):
+    """What FastAPI does by default: re-validate through response_model, then stdlib json"""
+    if isinstance(content, list):
+        content = [Booking(**doc) for doc in content]
+    serialized = await serialize_response(field=field, response_content=content)
+    return JSONResponse(content=serialized).body
+
+
+def fast_path(docs):
+    """Validate once, dump, encode with orjson"""
+    models = [Booking(**doc) for doc in docs]
+    return FastJSONResponse(content=to_primitive(models)).body
+
+
+def timed(label: str, runs: int, fn):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {best * 1000:9.1f} ms  ({len(body) / 1024:.0f} KiB)")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = make_docs(args.records)
+    loop = asyncio.new_event_loop()
+
+    print(f"GET /api/bookings with {args.records} records")
+    list_field = create_response_field(name="response", type_=List[Booking])
+    slow = timed("  default (response_model + json)", args.runs,
+                 lambda: loop.run_until_complete(default_path(list_field, docs)))
+    fast = timed("  fast (validate once + orjson)", args.runs, lambda: fast_path(docs))
+    print(f"  speedup: {slow / fast:.1f}x")
+
+    print("GET /api/availability/{date}")
+    availability = AvailabilityResponse(
+        date=datetime.utcnow().date(),
+        time_slots=[TimeSlot(time=label, available=True, booked=3, capacity=7) for label in SLOT_LABELS]
+    )
+    availability_field = create_response_field(name="response", type_=AvailabilityResponse)
+    slow = timed("  default (response_model + json)", args.runs * 200,
+                 lambda: loop.run_until_complete(default_path(availability_field, availability)))
+    fast = timed("  fast (orjson)", args.runs * 200,
+                 lambda: FastJSONResponse(content=to_primitive(availability)).body)
+    print(f"  speedup: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
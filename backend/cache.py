@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+
+def as_date(value) -> date:
+    """Normalize a booking date (datetime or date) to a plain date"""
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+class AvailabilityCache:
+    """Bounded LRU cache of computed availability responses with per-entry TTL.
+
+    Keys are (date, game_type, duration) tuples. A secondary index from date
+    to keys lets a booking write evict exactly the entries for its date.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._keys_by_date: Dict[date, Set[Tuple]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _drop(self, key: Tuple):
+        self._entries.pop(key, None)
+        day_keys = self._keys_by_date.get(key[0])
+        if day_keys is not None:
+            day_keys.discard(key)
+            if not day_keys:
+                del self._keys_by_date[key[0]]
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            self._drop(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Tuple, value: Any):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        self._entries[key] = (self._clock() + self.ttl_seconds, value)
+        self._keys_by_date.setdefault(key[0], set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._drop(oldest_key)
+            self.evictions += 1
+
+    def invalidate_date(self, day) -> int:
+        """Evict every cached entry for the given date"""
+        keys = self._keys_by_date.pop(as_date(day), set())
+        for key in keys:
+            self._entries.pop(key, None)
+        if keys:
+            self.invalidations += len(keys)
+            logger.debug(f"Evicted {len(keys)} availability cache entries for {day}")
+        return len(keys)
+
+    def on_booking_write(self, booking_date, game_type: str = None):
+        """Booking write listener: evict the affected date"""
+        self.invalidate_date(booking_date)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_date.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class CachedDocument:
+    """A loaded value together with its encoded JSON body and strong ETag"""
+
+    __slots__ = ("value", "body", "etag")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.body = json.dumps(jsonable_encoder(value), separators=(",", ":")).encode()
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+
+
+class ReadThroughCache:
+    """TTL cache for small reference data (settings, game types, gallery).
+
+    `get` loads a missing or expired key through its loader; concurrent
+    misses share one load. Each entry keeps its encoded body and ETag, so
+    a conditional request can be answered from memory alone. Writes in this
+    process call `invalidate`; other workers pick changes up within the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: Dict[str, Tuple[float, CachedDocument]] = {}
+        self._loads: Dict[str, asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def peek(self, key: str) -> Optional[CachedDocument]:
+        """The fresh cached entry for `key`, without loading"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            return None
+        return entry[1]
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> CachedDocument:
+        cached = self.peek(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        pending = self._loads.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._loads[key] = pending
+        generation = self._generations.get(key, 0)
+        try:
+            document = CachedDocument(await loader())
+        except BaseException as e:
+            pending.set_exception(e)
+            # Nobody else may be waiting; mark the exception as retrieved
+            pending.exception()
+            raise
+        finally:
+            self._loads.pop(key, None)
+        # Don't keep a value loaded before an invalidation that happened meanwhile
+        if self._generations.get(key, 0) == generation:
+            self._entries[key] = (self._clock() + self.ttl_seconds, document)
+        pending.set_result(document)
+        return document
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one key, or everything"""
+        keys = [key] if key is not None else list(set(self._entries) | set(self._loads))
+        for name in keys:
+            self._entries.pop(name, None)
+            self._generations[name] = self._generations.get(name, 0) + 1
+        self.invalidations += len(keys)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
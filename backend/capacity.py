@@ -0,0 +1,164 @@
+"""Atomic capacity enforcement for bookings.
+
+Every (date, game_type, slot) has a counter document in `slot_counters`.
+A booking reserves all the slots its duration covers with conditional
+`$inc` updates sent as one ordered bulk write: each update only matches
+while the counter is below capacity, and an upsert against a full
+counter collides with the existing `_id`, so the first full slot stops
+the batch and the slots already taken are given back.
+
+Two requests creating the same counter at once also collide on `_id`;
+the server does not retry such upserts because the filter is not
+equality-only. A duplicate key on a counter that still has room is
+therefore retried instead of being reported as full.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Tuple
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from cache import as_date
+from config import RESOURCE_CAPACITY
+from slots import SLOT_MINUTES, slot_index, slot_range
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class CapacityError(ValueError):
+    """Raised when a booking does not fit in the remaining capacity"""
+
+
+def slot_minutes_for_booking(time_slot: str, duration: int) -> List[int]:
+    """Minute-of-day offsets of every slot a booking covers, truncated at closing time"""
+    return [SLOT_MINUTES[index] for index in slot_range(slot_index(time_slot), duration)]
+
+
+class SlotCounters:
+    def __init__(self, db):
+        self.collection = db.slot_counters
+
+    @staticmethod
+    def _counter_id(day: date, game_type: str, slot_minute: int) -> str:
+        return f"{day.isoformat()}|{game_type}|{slot_minute}"
+
+    async def reserve(self, booking_date, game_type: str, slot_minutes: Iterable[int], units: int = 1):
+        """Take `units` of capacity in every slot, or none at all.
+
+        Raises CapacityError if any slot is already full.
+        """
+        day = as_date(booking_date)
+        await self.reserve_many({(day, game_type, minute): units for minute in slot_minutes})
+
+    async def reserve_many(self, claims: Dict[Tuple[date, str, int], int], attempts: int = 3):
+        """Take capacity in several counters at once, or none at all.
+
+        `claims` maps (date, game_type, slot_minute) to the units needed there,
+        so a group of bookings sharing a slot is checked against its combined
+        demand in a single ordered bulk write.
+        """
+        keys = sorted(claims)
+        if not keys:
+            return
+
+        for day, game_type, minute in keys:
+            if claims[(day, game_type, minute)] > RESOURCE_CAPACITY.get(game_type, 1):
+                raise CapacityError(self._full_message(day, game_type, minute))
+
+        operations = [
+            UpdateOne(
+                {
+                    "_id": self._counter_id(day, game_type, minute),
+                    "count": {"$lte": RESOURCE_CAPACITY.get(game_type, 1) - claims[(day, game_type, minute)]}
+                },
+                {
+                    "$inc": {"count": claims[(day, game_type, minute)]},
+                    "$setOnInsert": {
+                        "date": datetime.combine(day, datetime.min.time()),
+                        "game_type": game_type,
+                        "slot_minute": minute
+                    },
+                },
+                upsert=True
+            )
+            for day, game_type, minute in keys
+        ]
+
+        for _ in range(attempts):
+            try:
+                await self.collection.bulk_write(operations, ordered=True)
+                return
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                failed_index = write_errors[0]["index"] if write_errors else 0
+                # Ordered bulk writes stop at the first error; undo what went through
+                await self.release_many({key: claims[key] for key in keys[:failed_index]})
+                if not write_errors or write_errors[0].get("code") != DUPLICATE_KEY_ERROR:
+                    raise
+
+            day, game_type, minute = failed_key = keys[failed_index]
+            counter = await self.collection.find_one(
+                {"_id": self._counter_id(day, game_type, minute)}, projection={"_id": 0, "count": 1}
+            )
+            if counter is not None and counter.get("count", 0) > RESOURCE_CAPACITY.get(game_type, 1) - claims[failed_key]:
+                raise CapacityError(self._full_message(*failed_key))
+            # Another request created the counter first and it still has room; try again
+        raise CapacityError(self._full_message(*failed_key))
+
+    @staticmethod
+    def _full_message(day: date, game_type: str, slot_minute: int) -> str:
+        return f"{game_type} is fully booked at {slot_minute // 60:02d}:{slot_minute % 60:02d} on {day.isoformat()}"
+
+    async def release(self, booking_date, game_type: str, slot_minutes: Iterable[int], units: int = 1):
+        """Give back capacity taken by `reserve`"""
+        day = as_date(booking_date)
+        await self.release_many({(day, game_type, minute): units for minute in slot_minutes})
+
+    async def release_many(self, claims: Dict[Tuple[date, str, int], int]):
+        """Give back capacity taken by `reserve_many`"""
+        operations = [
+            UpdateOne(
+                {"_id": self._counter_id(day, game_type, minute), "count": {"$gte": units}},
+                {"$inc": {"count": -units}}
+            )
+            for (day, game_type, minute), units in claims.items()
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def rebuild(self, bookings_collection, from_date: date) -> int:
+        """Recompute counters for every date from `from_date` on from the bookings themselves"""
+        start = datetime.combine(from_date, datetime.min.time())
+        cursor = bookings_collection.find(
+            {"date": {"$gte": start}, "status": {"$ne": "cancelled"}},
+            projection={"_id": 0, "date": 1, "game_type": 1, "time_slot": 1, "duration": 1}
+        )
+
+        counts: Dict[str, Dict] = {}
+        async for doc in cursor:
+            day = as_date(doc["date"])
+            try:
+                minutes = slot_minutes_for_booking(doc["time_slot"], doc.get("duration", 60))
+            except ValueError:
+                logger.warning(f"Skipping booking with invalid time slot: {doc.get('time_slot')}")
+                continue
+            for minute in minutes:
+                counter_id = self._counter_id(day, doc["game_type"], minute)
+                entry = counts.setdefault(counter_id, {
+                    "date": datetime.combine(day, datetime.min.time()),
+                    "game_type": doc["game_type"],
+                    "slot_minute": minute,
+                    "count": 0,
+                })
+                entry["count"] += 1
+
+        await self.collection.delete_many({"date": {"$gte": start}})
+        if counts:
+            await self.collection.insert_many(
+                [{"_id": counter_id, **entry} for counter_id, entry in counts.items()]
+            )
+        logger.info(f"Rebuilt {len(counts)} slot counters from {from_date.isoformat()}")
+        return len(counts)
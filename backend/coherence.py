@@ -0,0 +1,165 @@
+"""Cross-worker cache coherence for booking data.
+
+Each uvicorn worker keeps its own in-process caches, so a booking written
+through one worker must also evict the cached dates in every other worker.
+BookingChangeListener follows the `bookings` collection's change stream and
+broadcasts date-level invalidations to every registered cache. When change
+streams are unavailable (standalone mongod), it falls back to polling
+`updated_at` in `availability_versions`, which every booking write bumps,
+deletes included.
+
+To try it locally against a single-node replica set:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017
+    mongosh --eval 'rs.initiate()'
+    MONGO_URL="mongodb://localhost:27017/?replicaSet=rs0" CACHE_COHERENCE=auto \\
+        uvicorn server:app --workers 2
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+import asyncio
+import logging
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from cache import as_date
+
+logger = logging.getLogger(__name__)
+
+# Server error codes meaning "this deployment has no change streams"
+CHANGE_STREAM_UNSUPPORTED_CODES = {
+    40573,  # $changeStream is only supported on replica sets
+    20,     # IllegalOperation
+}
+
+# Server error codes for a watch() option the server does not understand
+# (fullDocumentBeforeChange needs MongoDB 6.0+)
+UNKNOWN_OPTION_CODES = {9, 40415}
+
+
+class BookingChangeListener:
+    """Broadcast booking writes from any worker to this worker's caches.
+
+    Targets are objects exposing `invalidate_date(date)` and `clear()`.
+    """
+
+    def __init__(self, collection, targets: Optional[List] = None,
+                 mode: str = "auto", poll_interval: float = 2.0, versions_collection=None):
+        self.collection = collection
+        # Polled instead of `collection` so hard deletes are seen too
+        self.versions_collection = versions_collection if versions_collection is not None else collection
+        self.targets = list(targets or [])
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.active_mode: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+        self._use_pre_images = True
+
+    def add_target(self, target):
+        self.targets.append(target)
+
+    def _invalidate(self, booking_date):
+        for target in self.targets:
+            try:
+                if booking_date is None:
+                    target.clear()
+                else:
+                    target.invalidate_date(as_date(booking_date))
+            except Exception as e:
+                logger.error(f"Cache invalidation failed for {booking_date}: {e}", exc_info=True)
+
+    def handle_change(self, change: dict):
+        """Translate one change event into a date-level invalidation"""
+        self._resume_token = change.get("_id")
+        operation = change.get("operationType")
+
+        if operation == "invalidate":
+            # The stream is closed for good; the next watch() starts fresh
+            self._resume_token = None
+
+        document = change.get("fullDocument") or change.get("fullDocumentBeforeChange")
+        if document and "date" in document:
+            self._invalidate(document["date"])
+        else:
+            # Without the document (a delete without pre-images, a drop, ...) we
+            # cannot tell which date changed, so drop everything rather than serve stale data
+            self._invalidate(None)
+
+    async def _watch(self):
+        pipeline = [{"$match": {"operationType": {"$in": [
+            "insert", "update", "replace", "delete", "drop", "rename", "dropDatabase", "invalidate"
+        ]}}}]
+        options = {"full_document": "updateLookup", "resume_after": self._resume_token}
+        if self._use_pre_images:
+            # Lets deletes carry their date when the collection has pre-images enabled
+            options["full_document_before_change"] = "whenAvailable"
+        async with self.collection.watch(pipeline, **options) as stream:
+            self.active_mode = "change_stream"
+            logger.info("Cache coherence: following bookings change stream")
+            async for change in stream:
+                self.handle_change(change)
+
+    async def _poll(self):
+        self.active_mode = "poll"
+        logger.info(f"Cache coherence: polling {self.versions_collection.name}.updated_at every {self.poll_interval}s")
+        since = datetime.utcnow()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                # Overlap by one interval to tolerate clock skew between workers;
+                # re-invalidating a date is harmless
+                cursor = self.versions_collection.find(
+                    {"updated_at": {"$gte": since - timedelta(seconds=self.poll_interval)}},
+                    projection={"_id": 0, "date": 1, "updated_at": 1}
+                )
+                latest = since
+                seen_dates = set()
+                async for doc in cursor:
+                    if doc.get("date") is not None:
+                        seen_dates.add(as_date(doc["date"]))
+                    if doc.get("updated_at") and doc["updated_at"] > latest:
+                        latest = doc["updated_at"]
+                for booking_date in seen_dates:
+                    self._invalidate(booking_date)
+                since = latest
+            except PyMongoError as e:
+                logger.warning(f"Cache coherence poll failed: {e}")
+
+    async def run(self):
+        if self.mode == "poll":
+            await self._poll()
+            return
+
+        while True:
+            try:
+                await self._watch()
+            except OperationFailure as e:
+                if e.code in UNKNOWN_OPTION_CODES and self._use_pre_images:
+                    self._use_pre_images = False
+                    continue
+                if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                    logger.info(f"Change streams unavailable ({e.code}), falling back to polling")
+                    await self._poll()
+                    return
+                logger.warning(f"Change stream failed, restarting: {e}")
+                self._resume_token = None
+                self._invalidate(None)
+            except PyMongoError as e:
+                # Transient network errors: resume from the last seen event
+                logger.warning(f"Change stream interrupted, resuming: {e}")
+            await asyncio.sleep(1)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -1,3 +1,5 @@
+import os
+
 # Resource capacity configuration
 RESOURCE_CAPACITY = {
     "playstation": 7,
@@ -8,6 +10,10 @@ RESOURCE_CAPACITY = {
     "board_games": 999  # Unlimited
 }
 
+# Game types whose bookings are assigned a concrete station (1..capacity);
+# board games are a shared pool and are not tracked per station
+STATION_GAME_TYPES = ("playstation", "playstation_steering", "meta_quest_vr", "nintendo", "xbox")
+
 # Pricing per hour per person (in rupees)
 PRICING_PER_HOUR = {
     "playstation": 120,
@@ -18,11 +24,20 @@ PRICING_PER_HOUR = {
     "board_games": 50
 }
 
+# Durations (minutes) and party sizes covered by the precomputed quote table
+QUOTE_DURATIONS = (30, 60, 90, 120)
+QUOTE_MAX_PEOPLE = 20
+# How long clients may reuse the quote matrix before revalidating
+QUOTE_CACHE_MAX_AGE_SECONDS = 3600
+
 # Time slot configuration
 START_TIME = 10  # 10:00 AM
 END_TIME = 21    # 9:00 PM
 SLOT_INTERVAL = 30  # 30 minutes
 
+# Booking dates and slots are venue wall-clock time; "now" is read in this zone
+VENUE_TIMEZONE = os.environ.get("VENUE_TIMEZONE", "Asia/Kolkata")
+
 # Game type display names
 GAME_TYPE_NAMES = {
     "playstation": "PlayStation",
@@ -32,3 +47,59 @@ GAME_TYPE_NAMES = {
     "xbox": "Xbox",
     "board_games": "Board Games"
 }
+
+# Longest range (in days) the multi-day availability endpoint will compute
+MAX_AVAILABILITY_RANGE_DAYS = 62
+
+# Earliest-slot search: default and longest horizon (days) and most options returned
+SEARCH_DEFAULT_HORIZON_DAYS = 7
+SEARCH_MAX_HORIZON_DAYS = 31
+SEARCH_MAX_RESULTS = 50
+
+# Longest range (in days) the stats endpoints will report on
+MAX_STATS_RANGE_DAYS = 366
+
+# Page sizes for GET /api/bookings
+BOOKINGS_PAGE_SIZE = 100
+BOOKINGS_MAX_PAGE_SIZE = 500
+
+# Most bookings accepted in one group booking request
+GROUP_BOOKING_MAX_ITEMS = 50
+
+# Most bookings one bulk status request may change
+BULK_STATUS_MAX_BOOKINGS = 1000
+
+# Documents fetched per round trip when exporting bookings
+EXPORT_BATCH_SIZE = 500
+EXPORT_MAX_BATCH_SIZE = 5000
+
+# Idempotency-Key handling for POST /api/bookings: how long stored responses
+# are kept, and how long a duplicate waits for the original request to finish
+IDEMPOTENCY_KEY_TTL_SECONDS = 24 * 3600
+IDEMPOTENCY_WAIT_SECONDS = 10
+
+# Availability cache configuration
+AVAILABILITY_CACHE_MAX_ENTRIES = 1024
+AVAILABILITY_CACHE_TTL_SECONDS = 60
+
+# How long settings, game types and gallery images are served from memory
+REFERENCE_CACHE_TTL_SECONDS = 300
+
+# Browsers may reuse an availability response this long before revalidating it
+AVAILABILITY_HTTP_MAX_AGE_SECONDS = 5
+
+# Seconds between keep-alive comments on idle Server-Sent Events streams
+SSE_HEARTBEAT_SECONDS = 15
+
+# Encode booking and availability responses once with orjson and skip
+# FastAPI's response_model re-validation
+FAST_JSON_RESPONSES = os.environ.get("FAST_JSON_RESPONSES", "").lower() in ("1", "true", "yes")
+
+# Cross-worker cache coherence: "off", "auto" (change stream, falling back
+# to polling) or "poll"
+CACHE_COHERENCE_MODE = os.environ.get("CACHE_COHERENCE", "off").lower()
+CACHE_COHERENCE_POLL_INTERVAL = float(os.environ.get("CACHE_COHERENCE_POLL_INTERVAL", "2"))
+
+# Explain the hot booking queries at startup and refuse to start if any of
+# them would collection-scan
+VERIFY_QUERY_PLANS = os.environ.get("VERIFY_QUERY_PLANS", "").lower() in ("1", "true", "yes")
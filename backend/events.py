@@ -0,0 +1,217 @@
+"""Live availability push over Server-Sent Events.
+
+Clients subscribe to a date, a game type, or both. On connect they receive
+a snapshot of the per-slot occupancy for the subscribed date together with
+its version number; afterwards every booking write that changes occupancy
+produces a delta event carrying only the slots that changed and the new
+version. Version numbers come from the shared `availability_versions`
+counters, so they agree across workers. Reconnecting clients simply
+resubscribe and get a fresh snapshot.
+
+Deltas are computed in background tasks, one at a time per (date, game_type),
+so booking writes never wait for subscribers.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+
+from cache import as_date
+from config import RESOURCE_CAPACITY
+from slots import SLOT_LABELS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class Subscription:
+    date: Optional[date] = None
+    game_type: Optional[str] = None
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=100))
+    closed: bool = False
+
+    def matches(self, booking_date: date, game_type: str) -> bool:
+        return (self.date is None or self.date == booking_date) and \
+            (self.game_type is None or self.game_type == game_type)
+
+
+def format_sse(event: str, data: dict, event_id: Optional[str] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class AvailabilityBroadcaster:
+    """Fan booking writes out to subscribers as occupancy deltas"""
+
+    def __init__(self, availability_service, versions):
+        self.availability_service = availability_service
+        self.versions = versions
+        self._subscriptions: Set[Subscription] = set()
+        # Last counts sent for every (date, game_type) a subscriber has seen
+        self._snapshots: Dict[Tuple[date, str], List[int]] = {}
+        self._locks: Dict[Tuple[date, str], asyncio.Lock] = {}
+        self._lock_users: Dict[Tuple[date, str], int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def _key_lock(self, key: Tuple[date, str]):
+        """Serialise recomputation per (date, game_type); unused locks are dropped"""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    async def _counts(self, booking_date: date, game_type: str) -> List[int]:
+        records = await self.availability_service.booking_service.get_occupancy_records(
+            datetime.combine(booking_date, datetime.min.time()), game_type
+        )
+        occupancy = self.availability_service.build_occupancy(records)
+        return [int(count) for count in occupancy.counts(game_type)]
+
+    async def _refresh(self, booking_date: date, game_type: str) -> Tuple[List[int], int, Optional[List[int]]]:
+        """Recompute counts; returns (counts, version, changed slot indices).
+
+        Changed is None when there were no earlier counts to compare with.
+        The version is read before the bookings, so the counts include at
+        least every write that version stands for.
+        """
+        key = (booking_date, game_type)
+        version = await self.versions.get(booking_date, game_type)
+        counts = await self._counts(booking_date, game_type)
+        previous = self._snapshots.get(key)
+        changed = None if previous is None else [i for i, count in enumerate(counts) if previous[i] != count]
+        self._snapshots[key] = counts
+        return counts, version, changed
+
+    def _slot_payload(self, game_type: str, counts: List[int], indices) -> List[dict]:
+        capacity = RESOURCE_CAPACITY.get(game_type, 1)
+        return [
+            {"time": SLOT_LABELS[index], "booked": counts[index], "capacity": capacity,
+             "available": counts[index] < capacity}
+            for index in indices
+        ]
+
+    def _subscribers(self, booking_date: date, game_type: str, exclude: Optional[Subscription] = None):
+        return [
+            s for s in self._subscriptions
+            if s is not exclude and s.matches(booking_date, game_type)
+        ]
+
+    def _send(self, subscribers: List[Subscription], message: str):
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A client this far behind reconnects and gets a fresh snapshot
+                logger.warning("Dropping slow availability subscriber")
+                self.unsubscribe(subscription)
+
+    def _delta(self, booking_date: date, game_type: str, counts: List[int], version: int, changed: List[int]) -> str:
+        return format_sse("delta", {
+            "date": booking_date.isoformat(),
+            "game_type": game_type,
+            "version": version,
+            "time_slots": self._slot_payload(game_type, counts, changed),
+        }, event_id=f"{booking_date.isoformat()}:{game_type}:{version}")
+
+    async def subscribe(self, booking_date: Optional[date] = None, game_type: Optional[str] = None) -> Subscription:
+        """Register a subscriber and queue its initial snapshot"""
+        subscription = Subscription(date=booking_date, game_type=game_type)
+        self._subscriptions.add(subscription)
+
+        if booking_date is None:
+            subscription.queue.put_nowait(format_sse("ready", {"game_type": game_type}))
+            return subscription
+
+        game_types = [game_type] if game_type else list(RESOURCE_CAPACITY)
+        for snapshot_game_type in game_types:
+            key = (booking_date, snapshot_game_type)
+            async with self._key_lock(key):
+                counts, version, changed = await self._refresh(*key)
+                # Existing subscribers only hear about real changes they have not seen yet
+                if changed:
+                    self._send(self._subscribers(*key, exclude=subscription),
+                               self._delta(booking_date, snapshot_game_type, counts, version, changed))
+            subscription.queue.put_nowait(format_sse("snapshot", {
+                "date": booking_date.isoformat(),
+                "game_type": snapshot_game_type,
+                "version": version,
+                "time_slots": self._slot_payload(snapshot_game_type, counts, range(len(counts))),
+            }, event_id=f"{booking_date.isoformat()}:{snapshot_game_type}:{version}"))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.closed = True
+        self._subscriptions.discard(subscription)
+        # Forget snapshots nobody can receive deltas for any more
+        for key in [key for key in self._snapshots if not self._subscribers(*key)]:
+            del self._snapshots[key]
+
+    async def publish(self, booking_date, game_type: str, written: bool = True):
+        """Recompute occupancy for a date and game type and push what changed.
+
+        Without earlier counts to compare with (game types only wildcard
+        subscribers follow), the whole day is sent if this game type was
+        `written`, and nothing otherwise.
+        """
+        booking_date = as_date(booking_date)
+        if not self._subscribers(booking_date, game_type):
+            return
+
+        key = (booking_date, game_type)
+        async with self._key_lock(key):
+            counts, version, changed = await self._refresh(booking_date, game_type)
+            if changed is None:
+                changed = list(range(len(counts))) if written else []
+            subscribers = self._subscribers(booking_date, game_type)
+            if not changed or not subscribers:
+                return
+            self._send(subscribers, self._delta(booking_date, game_type, counts, version, changed))
+
+    def _schedule(self, booking_date, game_type: str, written: bool = True):
+        """Publish in the background, keeping a reference so the task is not collected"""
+        if not self._subscribers(as_date(booking_date), game_type):
+            return None
+        task = asyncio.create_task(self._publish_logged(booking_date, game_type, written))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _publish_logged(self, booking_date, game_type: str, written: bool):
+        try:
+            await self.publish(booking_date, game_type, written)
+        except Exception as e:
+            logger.error(f"Availability publish failed for {booking_date} {game_type}: {e}", exc_info=True)
+
+    def on_booking_write(self, booking_date, game_type: str):
+        """Booking write listener; returns without waiting for subscribers"""
+        self._schedule(booking_date, game_type)
+
+    def invalidate_date(self, booking_date):
+        """Cache coherence target: a write from another worker touched this date"""
+        # The game type is not known, so only compare against counts we have
+        for game_type in RESOURCE_CAPACITY:
+            self._schedule(booking_date, game_type, written=False)
+
+    def clear(self):
+        for booking_date in {s.date for s in self._subscriptions if s.date is not None}:
+            self.invalidate_date(booking_date)
+
+    async def stop(self):
+        """Cancel publishes still running, on shutdown"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
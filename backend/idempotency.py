@@ -0,0 +1,131 @@
+"""Idempotency keys for retried POST requests.
+
+A client sends an `Idempotency-Key` header with a create request. The key is
+looked up by `_id` in `idempotency_keys` first; if it is new, the request
+claims it by inserting a document keyed on it. When it finishes, its
+response is stored on that document. A retry with the same key then gets the
+stored response from that one `_id` lookup. A duplicate that arrives while the first request is still
+running waits for that response instead of repeating the work. Keys expire
+through a TTL index on `created_at`.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import json
+import logging
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(ValueError):
+    """Raised when a key is sent again with a different request body"""
+
+
+class IdempotencyKeyInProgress(Exception):
+    """Raised when the original request for a key did not finish in time"""
+
+
+def request_fingerprint(payload: Any) -> str:
+    """Stable hash of a request body, used to reject a key reused for another request"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, db, wait_seconds: float = 10.0, poll_interval: float = 0.1,
+                 stale_after_seconds: float = 60.0):
+        self.collection = db.idempotency_keys
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+        self.stale_after = timedelta(seconds=stale_after_seconds)
+        # Requests this worker is running, so local duplicates wait without polling
+        self._inflight: Dict[str, asyncio.Event] = {}
+
+    async def begin(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Claim `key`, or return the response stored for it.
+
+        Returns None when the caller owns the key and must run the request
+        and then call `complete` or `abandon`. Otherwise it returns the stored
+        {"status_code", "body"} of the first request, waiting for that request
+        to finish if it is still running.
+        """
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValueError(f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        deadline = asyncio.get_running_loop().time() + self.wait_seconds
+        while True:
+            now = datetime.utcnow()
+            doc = await self.collection.find_one({"_id": key})
+            if doc is None:
+                try:
+                    await self.collection.insert_one({
+                        "_id": key,
+                        "fingerprint": fingerprint,
+                        "state": "in_progress",
+                        "created_at": now,
+                    })
+                    self._inflight[key] = asyncio.Event()
+                    return None
+                except DuplicateKeyError:
+                    # Another request claimed it between our read and insert; read it again
+                    continue
+            if doc.get("fingerprint") != fingerprint:
+                raise IdempotencyKeyReused("Idempotency-Key was already used with a different request")
+            if doc.get("state") == "completed":
+                return doc["response"]
+
+            if now - doc["created_at"] > self.stale_after:
+                # The worker that claimed the key died mid-request; take it over
+                taken = await self.collection.find_one_and_update(
+                    {"_id": key, "state": "in_progress", "created_at": doc["created_at"]},
+                    {"$set": {"created_at": now}}
+                )
+                if taken:
+                    self._inflight[key] = asyncio.Event()
+                    return None
+                continue
+
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise IdempotencyKeyInProgress("A request with this Idempotency-Key is still being processed")
+            event = self._inflight.get(key)
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                else:
+                    await asyncio.sleep(min(self.poll_interval, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    async def complete(self, key: str, status_code: int, body: Any):
+        """Store the response for `key` and wake up local duplicates waiting on it"""
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "state": "completed",
+                    "response": {"status_code": status_code, "body": body},
+                    "completed_at": datetime.utcnow(),
+                }}
+            )
+        finally:
+            self._release(key)
+
+    async def abandon(self, key: str):
+        """Give up a claimed key so that a retry runs the request again"""
+        try:
+            await self.collection.delete_one({"_id": key, "state": "in_progress"})
+        except Exception as e:
+            logger.error(f"Failed to release idempotency key {key}: {e}")
+        finally:
+            self._release(key)
+
+    def _release(self, key: str):
+        event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
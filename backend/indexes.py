@@ -0,0 +1,180 @@
+"""MongoDB index provisioning and query-plan verification.
+
+`ensure_indexes` runs at startup and idempotently creates the indexes the
+hot booking queries rely on. `verify_query_plans` explains each hot query
+and raises if any of them would fall back to a collection scan; run it
+from CI or before a deploy with:
+
+    python indexes.py --check
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+import asyncio
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from config import IDEMPOTENCY_KEY_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "bookings": [
+        # Equality on game_type first, then the date range
+        IndexModel([("game_type", ASCENDING), ("date", ASCENDING)], name="game_type_date"),
+        # Overlap queries on persisted minute offsets; its date prefix also serves date-only ranges
+        IndexModel([("date", ASCENDING), ("game_type", ASCENDING), ("start_minute", ASCENDING)],
+                   name="date_game_type_start_minute"),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("reference_number", ASCENDING)], name="reference_number_unique", unique=True),
+        # Group bookings, looked up together when a group write is rolled back
+        IndexModel([("group_reference", ASCENDING)], name="group_reference", sparse=True),
+        # Keyset pagination of the booking list, unfiltered and per equality filter
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+                   name="status_created_at_id"),
+        IndexModel([("game_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+                   name="game_type_created_at_id"),
+        IndexModel([("phone", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+                   name="phone_created_at_id"),
+    ],
+    "slot_counters": [
+        # Counters are only consulted for upcoming sessions; expire them a month after the date
+        IndexModel([("date", ASCENDING)], name="date_ttl", expireAfterSeconds=31 * 24 * 3600),
+    ],
+    "station_slots": [
+        # Station schedules are loaded per date and game type; expire claims like the counters
+        IndexModel([("date", ASCENDING), ("game_type", ASCENDING)], name="date_game_type"),
+        IndexModel([("date", ASCENDING)], name="date_ttl", expireAfterSeconds=31 * 24 * 3600),
+    ],
+    "availability_versions": [
+        # Used by the cache coherence poller
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "daily_stats": [
+        # Stats reports read a date range, optionally for one game type
+        IndexModel([("date", ASCENDING), ("game_type", ASCENDING)], name="date_game_type"),
+    ],
+    "idempotency_keys": [
+        # Lookups go through _id; this only expires old keys
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=IDEMPOTENCY_KEY_TTL_SECONDS),
+    ],
+}
+
+
+def _hot_queries() -> List[Dict]:
+    """Representative filters for the queries that must never collection-scan"""
+    day = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    return [
+        {
+            "name": "bookings by date and game type",
+            "collection": "bookings",
+            "filter": {"date": {"$gte": day, "$lt": day + timedelta(days=1)}, "game_type": "playstation"},
+        },
+        {
+            "name": "bookings by date",
+            "collection": "bookings",
+            "filter": {"date": {"$gte": day, "$lt": day + timedelta(days=1)}},
+        },
+        {
+            "name": "bookings overlapping a time window",
+            "collection": "bookings",
+            "filter": {
+                "date": {"$gte": day, "$lt": day + timedelta(days=1)},
+                "game_type": "playstation",
+                "status": {"$ne": "cancelled"},
+                "$or": [
+                    {"start_minute": {"$lt": 15 * 60 + 30}, "end_minute": {"$gt": 14 * 60}},
+                    {"start_minute": {"$exists": False}},
+                ],
+            },
+        },
+        {
+            "name": "bookings page after a cursor",
+            "collection": "bookings",
+            "filter": {"$or": [
+                {"created_at": {"$lt": day}},
+                {"created_at": day, "id": {"$lt": "ffffffff"}},
+            ]},
+        },
+        {
+            "name": "booking by id",
+            "collection": "bookings",
+            "filter": {"id": "00000000-0000-0000-0000-000000000000"},
+        },
+        {
+            "name": "booking by reference number",
+            "collection": "bookings",
+            "filter": {"reference_number": "KGG00000000XXXXXXXX"},
+        },
+    ]
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create all required indexes; safe to call on every startup"""
+    created = {}
+    for collection_name, models in INDEXES.items():
+        try:
+            created[collection_name] = await db[collection_name].create_indexes(models)
+        except PyMongoError as e:
+            # Most likely existing duplicates blocking a unique index; keep serving
+            logger.error(f"Failed to create indexes on {collection_name}: {e}")
+    logger.info(f"Ensured indexes: {created}")
+    return created
+
+
+def _plan_stages(plan) -> List[str]:
+    """Collect every stage name in an explain() plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def verify_query_plans(db) -> Dict[str, List[str]]:
+    """Explain every hot query and raise RuntimeError if any uses COLLSCAN"""
+    plans = {}
+    offenders = []
+    for query in _hot_queries():
+        explanation = await db[query["collection"]].find(query["filter"]).explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning_plan)
+        plans[query["name"]] = stages
+        if "COLLSCAN" in stages:
+            offenders.append(query["name"])
+
+    if offenders:
+        raise RuntimeError(f"Queries falling back to COLLSCAN: {', '.join(offenders)}")
+    logger.info(f"Query plans verified: {plans}")
+    return plans
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Provision and verify MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="fail if any hot query collection-scans")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+        db = client[os.environ["DB_NAME"]]
+        try:
+            await ensure_indexes(db)
+            if args.check:
+                await verify_query_plans(db)
+        finally:
+            client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""One-off data migrations for the bookings collection.
+
+Run from the backend directory with MONGO_URL and DB_NAME set:
+
+    python migrations.py backfill-minutes --batch-size 500
+
+The derived collections can be rebuilt from the bookings for every date
+from --from-date on (default today). Pause booking writes while they run:
+
+    python migrations.py rebuild-counters --from-date 2025-01-01
+    python migrations.py rebuild-stats --from-date 2025-01-01
+    python migrations.py assign-stations --from-date 2025-01-01
+"""
+from datetime import date
+from typing import List
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+
+from capacity import SlotCounters
+from slots import booking_span
+from stations import StationAssigner
+from stats import DailyStats
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_booking_minutes(collection, batch_size: int = 500) -> int:
+    """Persist start_minute, end_minute and slot_indices on bookings that lack them.
+
+    Documents are updated in batches of `batch_size` with one bulk write per
+    batch, so the migration can run against a live collection.
+    """
+    cursor = collection.find(
+        {"start_minute": {"$exists": False}},
+        projection={"_id": 1, "time_slot": 1, "duration": 1},
+        batch_size=batch_size
+    )
+
+    updated = 0
+    skipped = 0
+    operations: List[UpdateOne] = []
+    async for doc in cursor:
+        try:
+            start_minute, end_minute, indices = booking_span(doc.get("time_slot"), doc.get("duration", 60))
+        except ValueError:
+            skipped += 1
+            continue
+
+        operations.append(UpdateOne(
+            {"_id": doc["_id"], "start_minute": {"$exists": False}},
+            {"$set": {"start_minute": start_minute, "end_minute": end_minute, "slot_indices": indices}}
+        ))
+        if len(operations) >= batch_size:
+            result = await collection.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+            operations = []
+
+    if operations:
+        result = await collection.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+
+    logger.info(f"Backfilled minute offsets on {updated} bookings ({skipped} with invalid time slots skipped)")
+    return updated
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Bookings data migrations")
+    parser.add_argument("migration", choices=["backfill-minutes", "rebuild-counters", "rebuild-stats", "assign-stations"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--from-date", default=date.today().isoformat(),
+                        help="first date to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+        db = client[os.environ["DB_NAME"]]
+        try:
+            from_date = date.fromisoformat(args.from_date)
+            if args.migration == "backfill-minutes":
+                await backfill_booking_minutes(db.bookings, args.batch_size)
+            elif args.migration == "rebuild-counters":
+                await SlotCounters(db).rebuild(db.bookings, from_date)
+            elif args.migration == "rebuild-stats":
+                await DailyStats(db).rebuild(db.bookings, from_date)
+            elif args.migration == "assign-stations":
+                await StationAssigner(db).rebuild(db.bookings, from_date)
+        finally:
+            client.close()
+
+    asyncio.run(main())
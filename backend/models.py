@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
 from datetime import date, datetime
+from datetime import date as date_type
 
 class BookingCreate(BaseModel):
     name: str
@@ -13,10 +14,23 @@ class BookingCreate(BaseModel):
     date: date
     special_requests: Optional[str] = None
 
+class BookingGroupCreate(BaseModel):
+    items: List[BookingCreate]
+
 class BookingUpdate(BaseModel):
     status: Optional[str] = None
     special_requests: Optional[str] = None
 
+class BookingStatusFilter(BaseModel):
+    date: Optional[date_type] = None
+    game_type: Optional[str] = None
+    status: Optional[str] = None
+
+class BookingBulkStatusUpdate(BaseModel):
+    status: str
+    ids: Optional[List[str]] = None
+    filter: Optional[BookingStatusFilter] = None
+
 class Booking(BaseModel):
     id: str
     reference_number: str
@@ -31,6 +45,11 @@ class Booking(BaseModel):
     date: date
     status: str = "pending"
     special_requests: Optional[str] = None
+    start_minute: Optional[int] = None  # Minutes after midnight the session starts
+    end_minute: Optional[int] = None  # Minutes after midnight the last covered slot ends
+    slot_indices: Optional[List[int]] = None
+    group_reference: Optional[str] = None  # Shared by bookings made together in one group request
+    station: Optional[int] = None  # Station number (1..capacity) for game types tracked per station
     created_at: datetime
     updated_at: datetime
 
@@ -41,6 +60,11 @@ class Booking(BaseModel):
             date: lambda v: v.isoformat()
         }
 
+class BookingGroup(BaseModel):
+    group_reference: str
+    total_price: float
+    bookings: List[Booking]
+
 class TimeSlot(BaseModel):
     time: str
     available: bool
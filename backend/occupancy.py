@@ -0,0 +1,161 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class OccupancyRecord:
+    """The few booking fields the availability code reads.
+
+    Built straight from projected MongoDB documents, skipping Booking model
+    validation on the hot path. Booking instances expose the same attributes,
+    so either can be fed to the occupancy builders.
+    """
+
+    __slots__ = ("date", "game_type", "time_slot", "duration", "status", "start_minute", "station")
+
+    PROJECTION = {
+        "_id": 0, "date": 1, "game_type": 1, "time_slot": 1,
+        "duration": 1, "status": 1, "start_minute": 1, "station": 1,
+    }
+
+    def __init__(self, date: Optional[date], game_type: str, time_slot: str, duration: int,
+                 status: str = "pending", start_minute: Optional[int] = None, station: Optional[int] = None):
+        self.date = date
+        self.game_type = game_type
+        self.time_slot = time_slot
+        self.duration = duration
+        self.status = status
+        self.start_minute = start_minute
+        self.station = station
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "OccupancyRecord":
+        booking_date = doc.get("date")
+        if isinstance(booking_date, datetime):
+            booking_date = booking_date.date()
+        return cls(booking_date, doc.get("game_type"), doc.get("time_slot"), doc.get("duration", 60),
+                   doc.get("status", "pending"), doc.get("start_minute"), doc.get("station"))
+
+
+class OccupancyMatrix:
+    """Slot occupancy for a single day, stored as one integer array per game type.
+
+    Bookings are recorded as difference-array updates (+1 at the start slot,
+    -1 one past the last covered slot); a prefix sum turns them into per-slot
+    booking counts, and a sliding-window max answers "can a booking of N
+    slots start here" for every start slot at once.
+    """
+
+    def __init__(self, num_slots: int):
+        self.num_slots = num_slots
+        self._diffs: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, np.ndarray] = {}
+
+    def _diff(self, game_type: str) -> np.ndarray:
+        if game_type not in self._diffs:
+            # One extra cell so bookings running to closing time have somewhere to end
+            self._diffs[game_type] = np.zeros(self.num_slots + 1, dtype=np.int32)
+        return self._diffs[game_type]
+
+    def add_bookings(self, game_type: str, starts: Iterable[int], lengths: Iterable[int]):
+        """Record bookings given their start slot indices and lengths in slots"""
+        starts = np.asarray(list(starts), dtype=np.int64)
+        lengths = np.asarray(list(lengths), dtype=np.int64)
+        if starts.size == 0:
+            return
+
+        ends = np.minimum(starts + np.maximum(lengths, 0), self.num_slots)
+        diff = self._diff(game_type)
+        np.add.at(diff, starts, 1)
+        np.add.at(diff, ends, -1)
+        self._counts.pop(game_type, None)
+
+    def add_booking(self, game_type: str, start: int, length: int):
+        self.add_bookings(game_type, [start], [length])
+
+    def counts(self, game_type: str) -> np.ndarray:
+        """Number of bookings covering each slot"""
+        if game_type not in self._counts:
+            diff = self._diffs.get(game_type)
+            if diff is None:
+                self._counts[game_type] = np.zeros(self.num_slots, dtype=np.int32)
+            else:
+                self._counts[game_type] = np.cumsum(diff[:-1], dtype=np.int32)
+        return self._counts[game_type]
+
+    def window_max(self, game_type: str, window: int) -> np.ndarray:
+        """Highest booking count over the `window` slots starting at each slot.
+
+        Windows are truncated at closing time, matching how bookings near the
+        end of the day only cover the slots that remain.
+        """
+        counts = self.counts(game_type)
+        if window <= 0:
+            return np.zeros(self.num_slots, dtype=np.int32)
+        if window == 1:
+            return counts
+
+        padded = np.concatenate([counts, np.zeros(window - 1, dtype=counts.dtype)])
+        return sliding_window_view(padded, window).max(axis=1)
+
+    def availability(self, game_type: str, window: int, capacity: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (available, booked) arrays for every start slot.
+
+        `booked` is the count at the start slot for bookable slots and the
+        count of the first full slot inside the window for slots that are not.
+        """
+        counts = self.counts(game_type)
+        available = self.window_max(game_type, window) < capacity
+
+        # For every slot, the index of the nearest full slot at or after it
+        positions = np.arange(self.num_slots)
+        full_positions = np.where(counts >= capacity, positions, self.num_slots - 1)
+        next_full = np.minimum.accumulate(full_positions[::-1])[::-1]
+        booked = np.where(available, counts, counts[next_full])
+        return available, booked
+
+
+class RangeOccupancy:
+    """Slot occupancy of one game type over consecutive days, as a (days x slots) array.
+
+    The same difference-array technique as OccupancyMatrix, vectorised over
+    days, so a multi-day search is a handful of array operations instead of
+    one availability computation per day.
+    """
+
+    def __init__(self, num_days: int, num_slots: int):
+        self.num_days = num_days
+        self.num_slots = num_slots
+        self._diff = np.zeros((num_days, num_slots + 1), dtype=np.int32)
+
+    def add_bookings(self, days: Iterable[int], starts: Iterable[int], lengths: Iterable[int]):
+        """Record bookings given their day offsets, start slot indices and lengths in slots"""
+        days = np.asarray(list(days), dtype=np.int64)
+        starts = np.asarray(list(starts), dtype=np.int64)
+        lengths = np.asarray(list(lengths), dtype=np.int64)
+        if days.size == 0:
+            return
+
+        ends = np.minimum(starts + np.maximum(lengths, 0), self.num_slots)
+        np.add.at(self._diff, (days, starts), 1)
+        np.add.at(self._diff, (days, ends), -1)
+
+    def counts(self) -> np.ndarray:
+        return np.cumsum(self._diff[:, :-1], axis=1, dtype=np.int32)
+
+    def window_max(self, window: int) -> np.ndarray:
+        """Highest count over the `window` slots starting at each slot; windows
+        running past closing time are reported as -1"""
+        counts = self.counts()
+        window = max(window, 1)
+        result = np.full((self.num_days, self.num_slots), -1, dtype=np.int32)
+        if window <= self.num_slots:
+            result[:, :self.num_slots - window + 1] = sliding_window_view(counts, window, axis=1).max(axis=2)
+        return result
+
+    def free_units(self, window: int, capacity: int) -> np.ndarray:
+        """Units still free for a `window`-slot session at every (day, start slot);
+        0 where the session would not fit before closing"""
+        peak = self.window_max(window)
+        return np.where(peak < 0, 0, np.maximum(capacity - peak, 0))
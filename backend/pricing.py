@@ -0,0 +1,94 @@
+"""Booking price quotes.
+
+Prices only depend on PRICING_PER_HOUR, the session length and the party
+size. The quote table for the durations and party sizes the booking form
+offers is built once at import. Single quotes and the full quote matrix
+served to the frontend both come from that table.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+import hashlib
+import json
+
+from config import PRICING_PER_HOUR, QUOTE_DURATIONS, QUOTE_MAX_PEOPLE
+
+
+class PricingEngine:
+    def __init__(self, rates: Dict[str, float] = PRICING_PER_HOUR,
+                 durations: Iterable[int] = QUOTE_DURATIONS, max_people: int = QUOTE_MAX_PEOPLE):
+        self.rates = dict(rates)
+        self.durations = tuple(durations)
+        self.max_people = max_people
+        self._table: Dict[Tuple[str, int, int], float] = {
+            (game_type, duration, num_people): self._compute(rate, duration, num_people)
+            for game_type, rate in self.rates.items()
+            for duration in self.durations
+            for num_people in range(1, max_people + 1)
+        }
+        self._matrix = self._build_matrix()
+        self._digest = hashlib.sha256(
+            json.dumps(self._matrix, sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()[:32]
+
+    @staticmethod
+    def _compute(rate_per_hour: float, duration: int, num_people: int) -> float:
+        return round(rate_per_hour * (duration / 60) * num_people, 2)
+
+    def price(self, game_type: str, duration: int, num_people: int) -> float:
+        """Total price of a booking; raises ValueError for unknown game types"""
+        if game_type not in self.rates:
+            raise ValueError(f"Invalid game type: {game_type}")
+        total_price = self._table.get((game_type, duration, num_people))
+        if total_price is None:
+            total_price = self._compute(self.rates[game_type], duration, num_people)
+        return total_price
+
+    def quote(self, game_type: str, duration: int, num_people: int) -> Dict:
+        """Price with the breakdown shown on the booking form"""
+        total_price = self.price(game_type, duration, num_people)
+        rate_per_hour = self.rates[game_type]
+        hours = duration / 60
+        return {
+            "game_type": game_type,
+            "duration": duration,
+            "num_people": num_people,
+            "rate_per_hour": rate_per_hour,
+            "total_price": total_price,
+            "breakdown": {
+                "rate": f"₹{rate_per_hour}/hour/person",
+                "hours": hours,
+                "people": num_people,
+                "calculation": f"₹{rate_per_hour} × {hours} hours × {num_people} people"
+            }
+        }
+
+    def _build_matrix(self) -> Dict:
+        return {
+            "durations": list(self.durations),
+            "max_people": self.max_people,
+            "game_types": {
+                game_type: {
+                    "rate_per_hour": rate,
+                    # prices[duration][num_people - 1]
+                    "prices": {
+                        str(duration): [self._table[(game_type, duration, n)] for n in range(1, self.max_people + 1)]
+                        for duration in self.durations
+                    }
+                }
+                for game_type, rate in self.rates.items()
+            }
+        }
+
+    def quote_matrix(self, game_type: Optional[str] = None) -> Dict:
+        """Every game type x duration x party size price, or one game type's"""
+        if game_type is None:
+            return self._matrix
+        if game_type not in self.rates:
+            raise ValueError(f"Invalid game type: {game_type}")
+        return {**self._matrix, "game_types": {game_type: self._matrix["game_types"][game_type]}}
+
+    def etag(self, game_type: Optional[str] = None) -> str:
+        """Strong ETag of `quote_matrix(game_type)`; changes whenever the rates do"""
+        return f'"{self._digest}-{game_type}"' if game_type else f'"{self._digest}"'
+
+
+pricing_engine = PricingEngine()
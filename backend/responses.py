@@ -0,0 +1,66 @@
+"""Fast JSON encoding for the booking read endpoints.
+
+With FAST_JSON_RESPONSES enabled, read endpoints validate each document once
+into a `Booking`, dump it to plain Python values and encode the result with
+orjson. Returning a Response directly also skips FastAPI's second
+validation pass through `response_model`, which dominates on list endpoints.
+"""
+from typing import Any, Dict, Optional
+import logging
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from config import FAST_JSON_RESPONSES
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+FAST_JSON_ENABLED = FAST_JSON_RESPONSES and orjson is not None
+if FAST_JSON_RESPONSES and orjson is None:
+    logger.warning("FAST_JSON_RESPONSES is set but orjson is not installed; using the default encoder")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (dates and datetimes are encoded natively)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def to_primitive(content: Any) -> Any:
+    """Dump pydantic models (and lists of them) to plain values without re-validating"""
+    if isinstance(content, BaseModel):
+        return content.model_dump()
+    if isinstance(content, list):
+        return [item.model_dump() if isinstance(item, BaseModel) else item for item in content]
+    return content
+
+
+def json_response(content: Any, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """Encode already-validated content once, with orjson when the fast path is on"""
+    if FAST_JSON_ENABLED:
+        return FastJSONResponse(content=to_primitive(content), headers=headers)
+    return JSONResponse(content=jsonable_encoder(content), headers=headers)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value covers `etag`"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def conditional_response(if_none_match: Optional[str], etag: str, body: bytes,
+                         cache_control: str = "no-cache") -> Response:
+    """A 304 when the client already has `etag`, otherwise the pre-encoded JSON body"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,24 +1,50 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
+import csv
+import io
+import json
 import logging
+from html import escape
+from urllib.parse import urlencode
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, date as date_type
 from typing import List, Optional
 
 # Import models and services
 from models import (
-    Booking, BookingCreate, BookingUpdate, GameType, GalleryImage,
+    Booking, BookingBulkStatusUpdate, BookingCreate, BookingGroup, BookingGroupCreate, BookingUpdate, GameType, GalleryImage,
     GalleryImageCreate, Settings, AvailabilityResponse
 )
 from services import (
     BookingService, AvailabilityService, GameTypeService,
     GalleryService, SettingsService
 )
+from cache import AvailabilityCache, ReadThroughCache
+from capacity import CapacityError
+from coherence import BookingChangeListener
+from events import AvailabilityBroadcaster
+from idempotency import IdempotencyKeyInProgress, IdempotencyKeyReused, IdempotencyStore, request_fingerprint
+from indexes import ensure_indexes, verify_query_plans
+from pricing import pricing_engine
+from slots import venue_now
+from responses import FAST_JSON_ENABLED, conditional_response, etag_matches, json_response
+from versions import AvailabilityVersions
+from config import (
+    AVAILABILITY_CACHE_MAX_ENTRIES, AVAILABILITY_CACHE_TTL_SECONDS,
+    CACHE_COHERENCE_MODE, CACHE_COHERENCE_POLL_INTERVAL, VERIFY_QUERY_PLANS,
+    MAX_AVAILABILITY_RANGE_DAYS, MAX_STATS_RANGE_DAYS, SSE_HEARTBEAT_SECONDS, RESOURCE_CAPACITY,
+    SEARCH_DEFAULT_HORIZON_DAYS, SEARCH_MAX_HORIZON_DAYS, SEARCH_MAX_RESULTS,
+    BOOKINGS_PAGE_SIZE, BOOKINGS_MAX_PAGE_SIZE, EXPORT_BATCH_SIZE, EXPORT_MAX_BATCH_SIZE,
+    GROUP_BOOKING_MAX_ITEMS, BULK_STATUS_MAX_BOOKINGS, IDEMPOTENCY_WAIT_SECONDS,
+    QUOTE_CACHE_MAX_AGE_SECONDS, REFERENCE_CACHE_TTL_SECONDS, AVAILABILITY_HTTP_MAX_AGE_SECONDS
+)
 
 ROOT_DIR = Path(__file__).parent
 # Only load .env file if it exists (for local development)
@@ -40,10 +66,30 @@ except Exception as e:
 
 # Initialize services
 booking_service = BookingService(db)
-availability_service = AvailabilityService(booking_service)
+availability_versions = AvailabilityVersions(db)
+# Bump versions before anything recomputes availability for the written date
+booking_service.add_write_listener(availability_versions.on_booking_write)
+availability_cache = AvailabilityCache(
+    max_entries=AVAILABILITY_CACHE_MAX_ENTRIES,
+    ttl_seconds=AVAILABILITY_CACHE_TTL_SECONDS
+)
+booking_service.add_write_listener(availability_cache.on_booking_write)
+availability_service = AvailabilityService(booking_service, cache=availability_cache)
+availability_broadcaster = AvailabilityBroadcaster(availability_service, availability_versions)
+booking_service.add_write_listener(availability_broadcaster.on_booking_write)
+booking_change_listener = BookingChangeListener(
+    db.bookings,
+    targets=[availability_cache, availability_broadcaster],
+    mode=CACHE_COHERENCE_MODE,
+    poll_interval=CACHE_COHERENCE_POLL_INTERVAL,
+    versions_collection=db.availability_versions
+)
+idempotency_store = IdempotencyStore(db, wait_seconds=IDEMPOTENCY_WAIT_SECONDS)
 game_type_service = GameTypeService(db)
 gallery_service = GalleryService(db)
 settings_service = SettingsService(db)
+# Settings, game types and gallery change rarely; serve them from memory
+reference_cache = ReadThroughCache(ttl_seconds=REFERENCE_CACHE_TTL_SECONDS)
 
 # Create the main app
 app = FastAPI(title="Karthikeya Games Galaxy API", version="1.0.0")
@@ -63,6 +109,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
 )
 
 # Configure logging
@@ -79,11 +126,55 @@ async def root():
 
 # Booking endpoints
 @api_router.post("/bookings", response_model=Booking)
-async def create_booking(booking_data: BookingCreate):
-    """Create a new booking"""
+async def create_booking(booking_data: BookingCreate,
+                         idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """Create a new booking.
+
+    With an Idempotency-Key header, retries of the same request get the
+    first response back instead of creating another booking.
+    """
+    if idempotency_key is None:
+        return await _create_booking(booking_data)
+
+    try:
+        stored = await idempotency_store.begin(idempotency_key, request_fingerprint(booking_data.dict()))
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyKeyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if stored is not None:
+        return JSONResponse(stored["body"], status_code=stored["status_code"], headers={"Idempotent-Replayed": "true"})
+
+    try:
+        booking = await _create_booking(booking_data)
+    except HTTPException as e:
+        # Client errors are final for this request; server errors may be retried
+        if e.status_code < 500:
+            await _store_idempotent_response(idempotency_key, e.status_code, {"detail": e.detail})
+        else:
+            await idempotency_store.abandon(idempotency_key)
+        raise
+    except BaseException:
+        await idempotency_store.abandon(idempotency_key)
+        raise
+    await _store_idempotent_response(idempotency_key, 200, jsonable_encoder(booking))
+    return booking
+
+async def _store_idempotent_response(idempotency_key: str, status_code: int, body):
+    """Store the response for replays; the request itself already succeeded, so never fail it here"""
+    try:
+        await idempotency_store.complete(idempotency_key, status_code, body)
+    except Exception as e:
+        logger.error(f"Failed to store the response for Idempotency-Key {idempotency_key}: {e}", exc_info=True)
+
+async def _create_booking(booking_data: BookingCreate) -> Booking:
     try:
         booking = await booking_service.create_booking(booking_data.dict())
         return booking
+    except CapacityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         logger.error(f"Validation error creating booking: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -91,6 +182,29 @@ async def create_booking(booking_data: BookingCreate):
         logger.error(f"Error creating booking: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to create booking: {str(e)}")
 
+@api_router.post("/bookings/group", response_model=BookingGroup)
+async def create_booking_group(group_data: BookingGroupCreate):
+    """Create several bookings at once under a shared group reference; all or nothing"""
+    if len(group_data.items) > GROUP_BOOKING_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A group booking can have at most {GROUP_BOOKING_MAX_ITEMS} items")
+    try:
+        group_reference, bookings = await booking_service.create_booking_group(
+            [item.dict() for item in group_data.items]
+        )
+        return BookingGroup(
+            group_reference=group_reference,
+            total_price=round(sum(booking.price for booking in bookings), 2),
+            bookings=bookings
+        )
+    except CapacityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        logger.error(f"Validation error creating group booking: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating group booking: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to create group booking: {str(e)}")
+
 @api_router.post("/bookings/calculate-price")
 async def calculate_price(data: dict):
     """Calculate price for a booking"""
@@ -102,41 +216,178 @@ async def calculate_price(data: dict):
         raise HTTPException(status_code=400, detail="game_type is required")
     
     try:
-        from config import PRICING_PER_HOUR
-        
-        if game_type not in PRICING_PER_HOUR:
-            raise HTTPException(status_code=400, detail=f"Invalid game type: {game_type}")
-        
-        rate_per_hour = PRICING_PER_HOUR[game_type]
-        hours = duration / 60
-        total_price = rate_per_hour * hours * num_people
-        
-        return {
-            "game_type": game_type,
-            "duration": duration,
-            "num_people": num_people,
-            "rate_per_hour": rate_per_hour,
-            "total_price": round(total_price, 2),
-            "breakdown": {
-                "rate": f"₹{rate_per_hour}/hour/person",
-                "hours": hours,
-                "people": num_people,
-                "calculation": f"₹{rate_per_hour} × {hours} hours × {num_people} people"
-            }
-        }
+        return pricing_engine.quote(game_type, duration, num_people)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/pricing/quotes")
+async def get_price_quotes(request: Request, game_type: Optional[str] = None):
+    """Price of every game type, duration and party size in one cacheable response"""
+    etag = pricing_engine.etag(game_type)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={QUOTE_CACHE_MAX_AGE_SECONDS}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    try:
+        return JSONResponse(pricing_engine.quote_matrix(game_type), headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def parse_date_param(value: Optional[str], name: str):
+    """Parse an optional YYYY-MM-DD query parameter"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}. Use YYYY-MM-DD")
+
 @api_router.get("/bookings", response_model=List[Booking])
-async def get_all_bookings():
-    """Get all bookings"""
+async def get_all_bookings(
+    limit: int = Query(BOOKINGS_PAGE_SIZE, ge=1, le=BOOKINGS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    status: Optional[str] = None,
+    game_type: Optional[str] = None,
+    phone: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get bookings newest first, one page at a time.
+
+    The token for the next page is returned in the X-Next-Cursor header;
+    pass it back as `cursor`. `fields` is a comma-separated projection.
+    """
     try:
-        bookings = await booking_service.get_all_bookings()
-        return bookings
+        field_list = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+        bookings, next_cursor = await booking_service.find_bookings_page(
+            limit=limit,
+            cursor=cursor,
+            fields=field_list,
+            date_from=parse_date_param(date_from, "date_from"),
+            date_to=parse_date_param(date_to, "date_to"),
+            status=status,
+            game_type=game_type,
+            phone=phone
+        )
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return json_response(bookings, headers=headers)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching bookings: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch bookings")
 
+EXPORT_FIELDS = [
+    "id", "reference_number", "name", "phone", "email", "game_type", "date", "time_slot",
+    "duration", "num_people", "price", "status", "special_requests", "created_at", "updated_at"
+]
+
+@api_router.get("/bookings/export")
+async def export_bookings(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=EXPORT_MAX_BATCH_SIZE),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    status: Optional[str] = None,
+    game_type: Optional[str] = None
+):
+    """Stream bookings as NDJSON or CSV in constant memory"""
+    filters = dict(
+        date_from=parse_date_param(date_from, "date_from"),
+        date_to=parse_date_param(date_to, "date_to"),
+        status=status,
+        game_type=game_type
+    )
+
+    def encode_value(value):
+        if isinstance(value, (datetime, date_type)):
+            return value.isoformat()
+        return value
+
+    async def generate_ndjson():
+        chunk = []
+        async for doc in booking_service.iter_booking_docs(batch_size=batch_size, **filters):
+            chunk.append(json.dumps({name: encode_value(doc.get(name)) for name in EXPORT_FIELDS}))
+            if len(chunk) >= batch_size:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+    async def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        rows = 0
+        async for doc in booking_service.iter_booking_docs(batch_size=batch_size, **filters):
+            writer.writerow([encode_value(doc.get(name)) for name in EXPORT_FIELDS])
+            rows += 1
+            if rows % batch_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    async def guarded(generator):
+        try:
+            async for chunk in generator:
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; log and end the stream early
+            logger.error(f"Error exporting bookings: {e}", exc_info=True)
+
+    if format == "csv":
+        return StreamingResponse(
+            guarded(generate_csv()),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=bookings.csv"}
+        )
+    return StreamingResponse(
+        guarded(generate_ndjson()),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=bookings.ndjson"}
+    )
+
+@api_router.get("/bookings/counts")
+async def get_booking_counts():
+    """Booking totals for the admin dashboard, independent of list paging"""
+    try:
+        return await booking_service.get_booking_counts()
+    except Exception as e:
+        logger.error(f"Error counting bookings: {e}")
+        raise HTTPException(status_code=500, detail="Failed to count bookings")
+
+@api_router.post("/bookings/bulk-status")
+async def bulk_update_booking_status(bulk_data: BookingBulkStatusUpdate):
+    """Change the status of many bookings, chosen by ids and/or a date/game_type/status filter"""
+    if bulk_data.ids is not None and len(bulk_data.ids) > BULK_STATUS_MAX_BOOKINGS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_STATUS_MAX_BOOKINGS} ids per request")
+    booking_filter = bulk_data.filter
+    try:
+        results = await booking_service.bulk_update_status(
+            bulk_data.status,
+            ids=bulk_data.ids,
+            max_bookings=BULK_STATUS_MAX_BOOKINGS,
+            date_from=booking_filter.date if booking_filter else None,
+            date_to=booking_filter.date if booking_filter else None,
+            game_type=booking_filter.game_type if booking_filter else None,
+            status=booking_filter.status if booking_filter else None
+        )
+        return {
+            "status": bulk_data.status,
+            "updated": sum(1 for item in results if item["result"] == "updated"),
+            "results": results
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error updating booking statuses: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to update booking statuses")
+
 @api_router.get("/bookings/{booking_id}", response_model=Booking)
 async def get_booking(booking_id: str):
     """Get booking by ID"""
@@ -144,7 +395,7 @@ async def get_booking(booking_id: str):
         booking = await booking_service.get_booking_by_id(booking_id)
         if not booking:
             raise HTTPException(status_code=404, detail="Booking not found")
-        return booking
+        return json_response(booking) if FAST_JSON_ENABLED else booking
     except HTTPException:
         raise
     except Exception as e:
@@ -161,6 +412,8 @@ async def update_booking(booking_id: str, update_data: BookingUpdate):
         return booking
     except HTTPException:
         raise
+    except CapacityError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Error updating booking: {e}")
         raise HTTPException(status_code=500, detail="Failed to update booking")
@@ -186,7 +439,7 @@ async def get_booking_by_reference(reference_number: str):
         booking = await booking_service.get_booking_by_reference(reference_number)
         if not booking:
             raise HTTPException(status_code=404, detail="Booking not found")
-        return booking
+        return json_response(booking) if FAST_JSON_ENABLED else booking
     except HTTPException:
         raise
     except Exception as e:
@@ -197,45 +450,137 @@ async def get_booking_by_reference(reference_number: str):
 async def cancel_booking_by_reference(reference_number: str):
     """Cancel booking by reference number (user self-cancellation)"""
     try:
-        booking = await booking_service.get_booking_by_reference(reference_number)
-        if not booking:
+        # Status and the 1 hour deadline are checked atomically with the update
+        cancelled_booking = await booking_service.cancel_booking_by_reference(reference_number)
+        if not cancelled_booking:
             raise HTTPException(status_code=404, detail="Booking not found")
-        
-        # Check if booking is already cancelled
-        if booking.status == "cancelled":
-            raise HTTPException(status_code=400, detail="Booking is already cancelled")
-        
-        # Check if cancellation is allowed (1 hour before session)
-        from datetime import datetime, timedelta
-        session_datetime = booking.date
-        current_time = datetime.utcnow()
-        cancellation_deadline = session_datetime - timedelta(hours=1)
-        
-        if current_time > cancellation_deadline:
-            raise HTTPException(
-                status_code=400, 
-                detail="Cancellation not allowed. Must cancel at least 1 hour before session time."
-            )
-        
-        # Update booking status to cancelled
-        updated_booking = await booking_service.update_booking(booking.id, {"status": "cancelled"})
         return {
             "message": "Booking cancelled successfully",
-            "booking": updated_booking
+            "booking": cancelled_booking
         }
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error cancelling booking: {e}")
         raise HTTPException(status_code=500, detail="Failed to cancel booking")
 
 # Availability endpoints
+@api_router.get("/availability")
+async def get_availability_range(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    game_type: str = None,
+    duration: int = 60
+):
+    """Stream availability for a range of dates as NDJSON, one day per line"""
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d").date()
+        end = datetime.strptime(to_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days + 1 > MAX_AVAILABILITY_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_AVAILABILITY_RANGE_DAYS} days")
+
+    async def generate():
+        try:
+            async for availability in availability_service.iter_availability_range(start, end, game_type, duration):
+                yield availability.model_dump_json() + "\n"
+        except Exception as e:
+            # Headers are already sent; log and end the stream early
+            logger.error(f"Error streaming availability range: {e}", exc_info=True)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@api_router.get("/availability/search")
+async def search_availability(
+    duration: int = 60,
+    game_type: Optional[List[str]] = Query(None),
+    start: Optional[str] = None,
+    horizon_days: int = Query(SEARCH_DEFAULT_HORIZON_DAYS, ge=1, le=SEARCH_MAX_HORIZON_DAYS),
+    limit: int = Query(5, ge=1, le=SEARCH_MAX_RESULTS),
+    units: int = Query(1, ge=1)
+):
+    """Earliest session starts with enough free units, across days and game types.
+
+    `game_type` may be repeated and defaults to every game type; `start`
+    (YYYY-MM-DDTHH:MM, venue local time) defaults to the venue's current time.
+    """
+    game_types = game_type or list(RESOURCE_CAPACITY)
+    unknown = [name for name in game_types if name not in RESOURCE_CAPACITY]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid game type: {', '.join(unknown)}")
+    try:
+        start_at = datetime.fromisoformat(start) if start else venue_now()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid start. Use YYYY-MM-DDTHH:MM")
+
+    try:
+        options = await availability_service.find_earliest_slots(
+            start_at, duration, list(dict.fromkeys(game_types)), horizon_days, limit, units
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching availability: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to search availability")
+    return {"start": start_at.isoformat(timespec="minutes"), "duration": duration, "options": options}
+
+@api_router.get("/availability/events")
+async def availability_events(request: Request, date: str = None, game_type: str = None):
+    """Server-Sent Events stream of occupancy snapshots and deltas for a date and/or game type"""
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date() if date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    subscription = await availability_broadcaster.subscribe(day, game_type)
+
+    async def generate():
+        try:
+            while not subscription.closed:
+                if await request.is_disconnected():
+                    break
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield message
+        finally:
+            availability_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.get("/availability/{date}", response_model=AvailabilityResponse)
-async def get_availability(date: str, game_type: str = None, duration: int = 60):
-    """Get availability for a specific date, optionally filtered by game type and duration"""
+async def get_availability(date: str, request: Request, response: Response,
+                           game_type: str = None, duration: int = 60):
+    """Get availability for a specific date, optionally filtered by game type and duration.
+
+    The ETag is the date's availability version, so a client that still has
+    the current version gets a 304 without any bookings being loaded.
+    """
     try:
         date_obj = datetime.strptime(date, "%Y-%m-%d")
-        availability = await availability_service.get_availability(date_obj, game_type, duration)
+        version = await availability_versions.get(date_obj, game_type) if game_type else 0
+        headers = {
+            "ETag": f'"{version}-{duration}"',
+            "Cache-Control": f"private, max-age={AVAILABILITY_HTTP_MAX_AGE_SECONDS}",
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        availability = await availability_service.get_availability(date_obj, game_type, duration, version=version)
+        if FAST_JSON_ENABLED:
+            return json_response(availability, headers=headers)
+        response.headers.update(headers)
         return availability
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
@@ -243,24 +588,79 @@ async def get_availability(date: str, game_type: str = None, duration: int = 60)
         logger.error(f"Error fetching availability: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch availability")
 
+def parse_stats_range(from_date: str, to_date: str):
+    """Validate the from/to range of the stats endpoints"""
+    start = parse_date_param(from_date, "from")
+    end = parse_date_param(to_date, "to")
+    if start is None or end is None:
+        raise HTTPException(status_code=400, detail="'from' and 'to' are required")
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days + 1 > MAX_STATS_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_STATS_RANGE_DAYS} days")
+    return start, end
+
+# Stats endpoints
+@api_router.get("/stats/daily")
+async def get_daily_stats(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    game_type: Optional[str] = None
+):
+    """Bookings, slot-hours, utilization and revenue per day and game type"""
+    start, end = parse_stats_range(from_date, to_date)
+    try:
+        return await booking_service.daily_stats.daily(start, end, game_type)
+    except Exception as e:
+        logger.error(f"Error fetching daily stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to fetch stats")
+
+@api_router.get("/stats/summary")
+async def get_stats_summary(
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to")
+):
+    """Totals per game type and overall for a date range"""
+    start, end = parse_stats_range(from_date, to_date)
+    try:
+        return await booking_service.daily_stats.summary(start, end)
+    except Exception as e:
+        logger.error(f"Error fetching stats summary: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to fetch stats")
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Get in-process cache hit/miss counters"""
+    return {
+        "availability": availability_cache.stats(),
+        "reference": reference_cache.stats(),
+        "coherence": booking_change_listener.active_mode or "off"
+    }
+
+@api_router.post("/cache/reference/invalidate")
+async def invalidate_reference_cache(key: Optional[str] = Query(None, pattern="^(settings|game_types|gallery)$")):
+    """Drop cached settings, game types and gallery (or one of them) after editing them in the database"""
+    reference_cache.invalidate(key)
+    return {"invalidated": key or "all"}
+
 # Game types endpoints
 @api_router.get("/game-types", response_model=List[GameType])
-async def get_game_types():
+async def get_game_types(request: Request):
     """Get all game types"""
     try:
-        game_types = await game_type_service.get_all_game_types()
-        return game_types
+        cached = await reference_cache.get("game_types", game_type_service.get_all)
+        return conditional_response(request.headers.get("if-none-match"), cached.etag, cached.body)
     except Exception as e:
         logger.error(f"Error fetching game types: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch game types")
 
 # Gallery endpoints
 @api_router.get("/gallery", response_model=List[GalleryImage])
-async def get_gallery():
+async def get_gallery(request: Request):
     """Get all gallery images"""
     try:
-        images = await gallery_service.get_all_images()
-        return images
+        cached = await reference_cache.get("gallery", gallery_service.get_all)
+        return conditional_response(request.headers.get("if-none-match"), cached.etag, cached.body)
     except Exception as e:
         logger.error(f"Error fetching gallery: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch gallery")
@@ -270,6 +670,7 @@ async def create_gallery_image(image_data: GalleryImageCreate):
     """Create a new gallery image"""
     try:
         image = await gallery_service.create_image(image_data.dict())
+        reference_cache.invalidate("gallery")
         return image
     except Exception as e:
         logger.error(f"Error creating gallery image: {e}")
@@ -277,13 +678,13 @@ async def create_gallery_image(image_data: GalleryImageCreate):
 
 # Settings endpoints
 @api_router.get("/settings", response_model=Settings)
-async def get_settings():
+async def get_settings(request: Request):
     """Get application settings"""
     try:
-        settings = await settings_service.get_settings()
-        if not settings:
+        cached = await reference_cache.get("settings", settings_service.get_settings)
+        if cached.value is None:
             raise HTTPException(status_code=404, detail="Settings not found")
-        return settings
+        return conditional_response(request.headers.get("if-none-match"), cached.etag, cached.body)
     except HTTPException:
         raise
     except Exception as e:
@@ -298,6 +699,7 @@ async def seed_database():
         await game_type_service.seed_game_types()
         await gallery_service.seed_gallery_images()
         await settings_service.seed_settings()
+        reference_cache.invalidate()
         logger.info("Database seeded successfully")
         return {"message": "Database seeded successfully"}
     except Exception as e:
@@ -318,51 +720,69 @@ async def startup_event():
     logger.info("Application startup event triggered")
     logger.info(f"MONGO_URL is set: {'YES' if 'MONGO_URL' in os.environ else 'NO'}")
     logger.info(f"DB_NAME is set: {'YES' if 'DB_NAME' in os.environ else 'NO'}")
+    await ensure_indexes(db)
+    if VERIFY_QUERY_PLANS:
+        await verify_query_plans(db)
+    if CACHE_COHERENCE_MODE != "off":
+        booking_change_listener.start()
 
 # Admin page to view bookings
-@app.get("/admin/bookings", response_class=HTMLResponse)
-async def admin_bookings_page():
-    """Simple admin page to view all bookings"""
+ADMIN_PAGE_SIZE = 50
+
+GAME_TYPE_DISPLAY = {
+    'playstation': '🎮 PlayStation',
+    'playstation_steering': '🏎️ PlayStation + Steering',
+    'xbox': '🎮 Xbox',
+    'nintendo_switch': '🕹️ Nintendo Switch',
+    'vr': '🥽 VR',
+    'board_games': '🎲 Board Games'
+}
+
+async def load_admin_page(cursor: Optional[str], date: Optional[str], status: Optional[str], limit: int):
+    """Fetch one newest-first page of bookings for the admin pages"""
+    day = parse_date_param(date, "date")
+    filters = dict(date_from=day, date_to=day, status=status or None)
     try:
-        bookings = await booking_service.get_all_bookings()
+        return await booking_service.find_bookings_page(limit=limit, cursor=cursor, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Build a simple HTML table for bookings
-        rows = []
-        for b in bookings:
-            if isinstance(b, dict):
-                bid = b.get("id", "")
-                game_type = b.get("game_type", "")
-                start_time = b.get("start_time", "")
-            else:
-                bid = getattr(b, "id", "")
-                game_type = getattr(b, "game_type", "")
-                start_time = getattr(b, "start_time", "")
-            rows.append(f"<tr><td>{bid}</td><td>{game_type}</td><td>{start_time}</td></tr>")
-
-        html = (
+def admin_page_url(path: str, **params) -> str:
+    query = urlencode({name: value for name, value in params.items() if value})
+    return f"{path}?{query}" if query else path
+
+@app.get("/admin/bookings", response_class=HTMLResponse)
+async def admin_bookings_page(
+    cursor: Optional[str] = None,
+    date: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=BOOKINGS_MAX_PAGE_SIZE)
+):
+    """Simple admin page to view bookings, one page at a time"""
+    bookings, next_cursor = await load_admin_page(cursor, date, status, limit)
+
+    async def generate():
+        yield (
             "<html><head><title>Admin Bookings</title></head><body>"
             "<h1>Bookings</h1>"
             "<table border='1'>"
-            "<tr><th>ID</th><th>Game Type</th><th>Start Time</th></tr>"
-            f"{''.join(rows)}"
-            "</table></body></html>"
+            "<tr><th>ID</th><th>Game Type</th><th>Date</th><th>Start Time</th><th>Status</th></tr>"
         )
+        for b in bookings:
+            yield (
+                f"<tr><td>{escape(b.id)}</td><td>{escape(b.game_type)}</td><td>{b.date.isoformat()}</td>"
+                f"<td>{escape(b.time_slot)}</td><td>{escape(b.status)}</td></tr>"
+            )
+        yield "</table>"
+        if next_cursor:
+            next_url = admin_page_url("/admin/bookings", cursor=next_cursor, date=date, status=status, limit=limit)
+            yield f"<p><a href='{escape(next_url)}'>Next page</a></p>"
+        yield "</body></html>"
 
-        return HTMLResponse(content=html)
-    except Exception as e:
-        logger.error(f"Error fetching bookings for admin page: {e}")
-        raise HTTPException(status_code=500, detail="Failed to load admin bookings")
+    return StreamingResponse(generate(), media_type="text/html")
 
 # Note: Below is an alternate, more styled admin page template.
-# It continues the HTML/CSS started elsewhere in the file.
-@app.get("/admin/bookings/styled", response_class=HTMLResponse)
-async def admin_bookings_styled_page():
-    """Styled admin page to view all bookings"""
-    try:
-        bookings = await booking_service.get_all_bookings()
-
-        # Create simple HTML page
-        html_content = """
+ADMIN_STYLED_HEAD = """
         <!DOCTYPE html>
         <html>
         <head>
@@ -372,6 +792,9 @@ async def admin_bookings_styled_page():
                 body { font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }
                 .container { max-width: 1200px; margin: 0 auto; background: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
                 h1 { color: #3b82f6; text-align: center; margin-bottom: 30px; }
+                .filters { display: flex; gap: 10px; justify-content: center; margin-bottom: 20px; flex-wrap: wrap; }
+                .pager { display: flex; justify-content: space-between; margin-top: 20px; }
+                .pager a { color: #3b82f6; text-decoration: none; font-weight: bold; }
                 .booking-card { border: 1px solid #e2e8f0; border-radius: 8px; margin: 15px 0; padding: 15px; background: #f8fafc; }
                 .booking-header { display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px; }
                 .booking-name { font-size: 18px; font-weight: bold; color: #1e293b; }
@@ -392,42 +815,51 @@ async def admin_bookings_styled_page():
         <body>
             <div class="container">
                 <h1>🎮 Karthikeya Games Galaxy - Bookings</h1>
-        """
-        
-        if bookings:
-            html_content += f"<p style='text-align: center; color: #64748b;'>Total Bookings: {len(bookings)}</p>"
-            
-            # Sort bookings by created_at descending (newest first)
-            sorted_bookings = sorted(bookings, key=lambda x: x.created_at, reverse=True)
-            
-            for booking in sorted_bookings:
-                game_type_display = {
-                    'playstation': '🎮 PlayStation',
-                    'playstation_steering': '🏎️ PlayStation + Steering',
-                    'xbox': '🎮 Xbox',
-                    'nintendo_switch': '🕹️ Nintendo Switch',
-                    'vr': '🥽 VR',
-                    'board_games': '🎲 Board Games'
-                }.get(booking.game_type, booking.game_type)
-                
-                html_content += f"""
+"""
+
+ADMIN_STYLED_FOOT = """
+            </div>
+            <script>
+                // Reload when a booking changes; fall back to polling every 30 seconds
+                if (window.EventSource) {
+                    const events = new EventSource('/api/availability/events');
+                    let reloadTimer = null;
+                    events.addEventListener('delta', () => {
+                        clearTimeout(reloadTimer);
+                        reloadTimer = setTimeout(() => location.reload(), 1000);
+                    });
+                } else {
+                    setTimeout(() => location.reload(), 30000);
+                }
+            </script>
+        </body>
+        </html>
+"""
+
+def render_booking_card(booking: Booking) -> str:
+    game_type_display = GAME_TYPE_DISPLAY.get(booking.game_type, booking.game_type)
+    special_requests = (
+        f'<div style="margin-top: 10px;"><span class="detail-label">Special Requests:</span> {escape(booking.special_requests)}</div>'
+        if booking.special_requests else ''
+    )
+    return f"""
                 <div class="booking-card">
                     <div class="booking-header">
-                        <div class="booking-name">{booking.name}</div>
-                        <div class="booking-status status-{booking.status}">{booking.status.upper()}</div>
+                        <div class="booking-name">{escape(booking.name)}</div>
+                        <div class="booking-status status-{escape(booking.status)}">{escape(booking.status.upper())}</div>
                     </div>
                     <div class="booking-details">
                         <div class="detail-item">
                             <span class="detail-label">Phone:</span>
-                            <span class="detail-value">{booking.phone}</span>
+                            <span class="detail-value">{escape(booking.phone)}</span>
                         </div>
                         <div class="detail-item">
                             <span class="detail-label">Email:</span>
-                            <span class="detail-value">{booking.email or 'Not provided'}</span>
+                            <span class="detail-value">{escape(booking.email or 'Not provided')}</span>
                         </div>
                         <div class="detail-item">
                             <span class="detail-label">Game Type:</span>
-                            <span class="detail-value">{game_type_display}</span>
+                            <span class="detail-value">{escape(game_type_display)}{f" #{booking.station}" if booking.station else ""}</span>
                         </div>
                         <div class="detail-item">
                             <span class="detail-label">Date:</span>
@@ -435,45 +867,73 @@ async def admin_bookings_styled_page():
                         </div>
                         <div class="detail-item">
                             <span class="detail-label">Time Slot:</span>
-                            <span class="detail-value">{booking.time_slot}</span>
+                            <span class="detail-value">{escape(booking.time_slot)}</span>
                         </div>
                         <div class="detail-item">
                             <span class="detail-label">Booking ID:</span>
-                            <span class="detail-value">{booking.id[:8]}...</span>
+                            <span class="detail-value">{escape(booking.id[:8])}...</span>
                         </div>
                     </div>
-                    {f'<div style="margin-top: 10px;"><span class="detail-label">Special Requests:</span> {booking.special_requests}</div>' if booking.special_requests else ''}
+                    {special_requests}
                     <div style="margin-top: 10px; font-size: 12px; color: #64748b;">
                         Created: {booking.created_at.strftime('%B %d, %Y at %I:%M %p')}
                     </div>
                 </div>
                 """
+
+@app.get("/admin/bookings/styled", response_class=HTMLResponse)
+async def admin_bookings_styled_page(
+    cursor: Optional[str] = None,
+    date: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(ADMIN_PAGE_SIZE, ge=1, le=BOOKINGS_MAX_PAGE_SIZE)
+):
+    """Styled admin page to view bookings, newest first, one page at a time"""
+    bookings, next_cursor = await load_admin_page(cursor, date, status, limit)
+
+    async def generate():
+        yield ADMIN_STYLED_HEAD
+        status_options = "".join(
+            f"<option value='{value}'{' selected' if value == (status or '') else ''}>{label}</option>"
+            for value, label in [("", "All statuses"), ("pending", "Pending"),
+                                 ("confirmed", "Confirmed"), ("cancelled", "Cancelled")]
+        )
+        yield f"""
+                <form class="filters" method="get">
+                    <input type="date" name="date" value="{escape(date or '')}">
+                    <select name="status">{status_options}</select>
+                    <button type="submit">Filter</button>
+                </form>
+        """
+
+        if bookings:
+            yield f"<p style='text-align: center; color: #64748b;'>Showing {len(bookings)} bookings</p>"
+            for booking in bookings:
+                yield render_booking_card(booking)
         else:
-            html_content += """
+            yield """
             <div class="no-bookings">
                 <h3>No bookings found</h3>
                 <p>Bookings will appear here when customers make reservations.</p>
             </div>
             """
-        
-        html_content += """
-            </div>
-            <script>
-                // Auto-refresh every 30 seconds
-                setTimeout(() => location.reload(), 30000);
-            </script>
-        </body>
-        </html>
-        """
-        
-        return html_content
 
-    except Exception as e:
-        logger.error(f"Error loading admin page: {e}")
-        return f"<html><body><h1>Error loading bookings: {str(e)}</h1></body></html>"
+        links = []
+        if cursor:
+            links.append(f"<a href='{escape(admin_page_url('/admin/bookings/styled', date=date, status=status, limit=limit))}'>← Newest</a>")
+        if next_cursor:
+            next_url = admin_page_url("/admin/bookings/styled", cursor=next_cursor, date=date, status=status, limit=limit)
+            links.append(f"<a href='{escape(next_url)}'>Older →</a>")
+        if links:
+            yield f"<div class='pager'>{''.join(links)}</div>"
+        yield ADMIN_STYLED_FOOT
+
+    return StreamingResponse(generate(), media_type="text/html")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await booking_change_listener.stop()
+    await availability_broadcaster.stop()
     client.close()
 
 
@@ -1,17 +1,98 @@
-from datetime import datetime, date, timedelta, time
-from typing import List, Optional, Dict
+from datetime import datetime, date, timedelta
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Dict, Tuple
 from models import Booking, GameType, GalleryImage, Settings, TimeSlot, AvailabilityResponse, PricingInfo, ContactInfo
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from config import RESOURCE_CAPACITY, PRICING_PER_HOUR, START_TIME, END_TIME, SLOT_INTERVAL
+from pymongo import ReturnDocument, UpdateOne
+from config import RESOURCE_CAPACITY, SLOT_INTERVAL
+from occupancy import OccupancyMatrix, OccupancyRecord, RangeOccupancy
+from cache import AvailabilityCache, as_date
+from capacity import CapacityError, SlotCounters, slot_minutes_for_booking
+from pricing import pricing_engine
+from stats import DailyStats
+from stations import StationAssigner, StationSchedule, booking_slot_span, is_station_tracked
+from slots import (
+    MINUTE_INDEX, NUM_SLOTS, SLOT_INDEX, SLOT_LABELS, SLOT_MINUTES,
+    booking_span, slot_count, slot_index, slot_range, venue_now
+)
+from bisect import bisect_left
+import asyncio
+import base64
+import inspect
+import json
 import logging
 import uuid
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Statuses the admin dashboard shows totals for
+DASHBOARD_STATUSES = ("pending", "confirmed", "cancelled")
+
 class BookingService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.collection = db.bookings
+        self.slot_counters = SlotCounters(db)
+        self.daily_stats = DailyStats(db)
+        self.stations = StationAssigner(db)
+        self._write_listeners: List[Callable] = []
+
+    def add_write_listener(self, listener: Callable):
+        """Register a callback(booking_date, game_type) run after every booking write"""
+        self._write_listeners.append(listener)
+
+    async def _notify_write(self, booking_date, game_type: str):
+        """Tell listeners (caches, push channels) that a date's bookings changed"""
+        booking_date = as_date(booking_date)
+        for listener in self._write_listeners:
+            try:
+                result = listener(booking_date, game_type)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Booking write listener failed for {booking_date}: {e}", exc_info=True)
+
+    async def _record_stats(self, transitions: List[Tuple[dict, Optional[str], Optional[str]]]):
+        """Update the daily rollups; a failure here never fails the booking write"""
+        try:
+            await self.daily_stats.record(transitions)
+        except Exception as e:
+            logger.error(f"Failed to update daily stats: {e}", exc_info=True)
+
+    async def _assign_stations(self, booking_docs: List[dict]):
+        """Pick a station for every booking of a tracked game type and set it on the documents.
+
+        All or nothing: if any booking has no station free for its whole
+        session, the stations already claimed are given back and
+        CapacityError is raised.
+        """
+        by_day: Dict[Tuple[date, str], List[dict]] = {}
+        for booking_doc in booking_docs:
+            if is_station_tracked(booking_doc['game_type']) and booking_slot_span(booking_doc) is not None:
+                by_day.setdefault((as_date(booking_doc['date']), booking_doc['game_type']), []).append(booking_doc)
+
+        assigned: List[dict] = []
+        try:
+            for (booking_date, game_type), docs in by_day.items():
+                stations = await self.stations.assign(
+                    booking_date, game_type, [booking_slot_span(doc) for doc in docs], [doc['id'] for doc in docs]
+                )
+                for booking_doc, station in zip(docs, stations):
+                    booking_doc['station'] = station
+                    assigned.append(booking_doc)
+        except Exception:
+            await self._release_stations(assigned)
+            raise
+
+    async def _release_stations(self, booking_docs: Iterable[dict]):
+        """Give back the station claims of bookings that hold one"""
+        for booking_doc in booking_docs:
+            span = booking_slot_span(booking_doc)
+            if booking_doc.get('station') is None or span is None or not is_station_tracked(booking_doc['game_type']):
+                continue
+            await self.stations.release(
+                booking_doc['date'], booking_doc['game_type'], booking_doc['station'], span, booking_doc['id']
+            )
 
     def _prepare_booking_doc(self, booking_doc: dict) -> dict:
         """Convert datetime to date for the date field when reading from MongoDB"""
@@ -22,65 +103,136 @@ class BookingService:
 
     def calculate_price(self, game_type: str, duration: int, num_people: int) -> float:
         """Calculate total price based on game type, duration, and number of people"""
-        if game_type not in PRICING_PER_HOUR:
-            raise ValueError(f"Invalid game type: {game_type}")
+        return pricing_engine.price(game_type, duration, num_people)
+
+    def _build_booking(self, booking_data: dict, current_time: datetime) -> Tuple[Booking, dict, List[int]]:
+        """Validate and price a new booking; returns (booking, MongoDB document, slot minutes)"""
+        price = self.calculate_price(
+            booking_data['game_type'],
+            booking_data.get('duration', 60),
+            booking_data.get('num_people', 1)
+        )
+
+        booking_id = str(uuid.uuid4())
+        reference_number = f"KGG{datetime.now().strftime('%Y%m%d')}{booking_id[:8].upper()}"
+
+        # Normalize the incoming date into a datetime object so MongoDB can encode it.
+        incoming_date = booking_data.get('date')
+        if isinstance(incoming_date, str):
+            # Parse ISO strings; preserve timezone if provided, otherwise assume naive UTC
+            parsed = datetime.fromisoformat(incoming_date.replace('Z', '+00:00'))
+            booking_data['date'] = parsed
+        elif isinstance(incoming_date, date) and not isinstance(incoming_date, datetime):
+            # If a date (but not datetime) was provided, convert to datetime at midnight
+            booking_data['date'] = datetime.combine(incoming_date, datetime.min.time())
+        # If it's already a datetime, leave as-is.
+
+        # Store the canonical slot label along with every slot the booking covers
+        booking_data['time_slot'] = SLOT_LABELS[slot_index(booking_data['time_slot'])]
+        start_minute, end_minute, indices = booking_span(booking_data['time_slot'], booking_data.get('duration', 60))
+        booking_data['start_minute'] = start_minute
+        booking_data['end_minute'] = end_minute
+        booking_data['slot_indices'] = indices
+
+        booking_data['id'] = booking_id
+        booking_data['reference_number'] = reference_number
+        booking_data['price'] = price
+        booking_data['status'] = 'pending'
+        booking_data['created_at'] = current_time
+        booking_data['updated_at'] = current_time
+
+        booking = Booking(**booking_data)
+
+        try:
+            booking_dict = booking.model_dump()
+        except AttributeError:
+            booking_dict = booking.dict()
 
-        rate_per_hour = PRICING_PER_HOUR[game_type]
-        hours = duration / 60  # Convert minutes to hours
-        total_price = rate_per_hour * hours * num_people
+        # Ensure the dict that goes into MongoDB has a datetime for 'date'
+        if 'date' in booking_dict and isinstance(booking_dict['date'], date) and not isinstance(booking_dict['date'], datetime):
+            booking_dict['date'] = datetime.combine(booking_dict['date'], datetime.min.time())
 
-        return round(total_price, 2)
+        return booking, booking_dict, [SLOT_MINUTES[index] for index in indices]
 
     async def create_booking(self, booking_data: dict) -> Booking:
         """Create a new booking with price calculation"""
         try:
-            price = self.calculate_price(
-                booking_data['game_type'],
-                booking_data.get('duration', 60),
-                booking_data.get('num_people', 1)
-            )
-
-            booking_id = str(uuid.uuid4())
-            reference_number = f"KGG{datetime.now().strftime('%Y%m%d')}{booking_id[:8].upper()}"
-            current_time = datetime.utcnow()
-
-            # Normalize the incoming date into a datetime object so MongoDB can encode it.
-            incoming_date = booking_data.get('date')
-            if isinstance(incoming_date, str):
-                # Parse ISO strings; preserve timezone if provided, otherwise assume naive UTC
-                parsed = datetime.fromisoformat(incoming_date.replace('Z', '+00:00'))
-                booking_data['date'] = parsed
-            elif isinstance(incoming_date, date) and not isinstance(incoming_date, datetime):
-                # If a date (but not datetime) was provided, convert to datetime at midnight
-                booking_data['date'] = datetime.combine(incoming_date, datetime.min.time())
-            # If it's already a datetime, leave as-is.
-
-            booking_data['id'] = booking_id
-            booking_data['reference_number'] = reference_number
-            booking_data['price'] = price
-            booking_data['status'] = 'pending'
-            booking_data['created_at'] = current_time
-            booking_data['updated_at'] = current_time
-
-            booking = Booking(**booking_data)
+            booking, booking_dict, slot_minutes = self._build_booking(booking_data, datetime.utcnow())
+            await self.slot_counters.reserve(booking.date, booking.game_type, slot_minutes)
 
             try:
-                booking_dict = booking.model_dump()
-            except AttributeError:
-                booking_dict = booking.dict()
-
-            # Ensure the dict that goes into MongoDB has a datetime for 'date'
-            if 'date' in booking_dict and isinstance(booking_dict['date'], date) and not isinstance(booking_dict['date'], datetime):
-                booking_dict['date'] = datetime.combine(booking_dict['date'], datetime.min.time())
-
-            await self.collection.insert_one(booking_dict)
-
-            logger.info(f"Created booking for {booking.name} on {booking.date} - Price: ₹{price}")
+                await self._assign_stations([booking_dict])
+                booking.station = booking_dict.get('station')
+                try:
+                    await self.collection.insert_one(booking_dict)
+                except Exception:
+                    await self._release_stations([booking_dict])
+                    raise
+            except Exception:
+                await self.slot_counters.release(booking.date, booking.game_type, slot_minutes)
+                raise
+            await self._record_stats([(booking_dict, None, booking.status)])
+            await self._notify_write(booking.date, booking.game_type)
+
+            logger.info(f"Created booking for {booking.name} on {booking.date} - Price: ₹{booking.price}")
             return booking
+        except CapacityError:
+            # Expected when a slot fills up; the API answers 409
+            raise
         except Exception as e:
             logger.error(f"Error in create_booking: {str(e)}", exc_info=True)
             raise
 
+    async def create_booking_group(self, items: List[dict]) -> Tuple[str, List[Booking]]:
+        """Create several bookings under one group reference, all or nothing.
+
+        Every item is validated and priced first, then capacity for the whole
+        group is reserved in one step (bookings sharing a slot count together)
+        and the bookings are written with a single insert_many.
+        """
+        if not items:
+            raise ValueError("A group booking needs at least one item")
+
+        current_time = datetime.utcnow()
+        group_reference = f"GRP{datetime.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:8].upper()}"
+
+        bookings: List[Booking] = []
+        booking_dicts: List[dict] = []
+        claims: Dict[Tuple[date, str, int], int] = {}
+        for item in items:
+            item['group_reference'] = group_reference
+            booking, booking_dict, slot_minutes = self._build_booking(item, current_time)
+            bookings.append(booking)
+            booking_dicts.append(booking_dict)
+            for minute in slot_minutes:
+                key = (booking.date, booking.game_type, minute)
+                claims[key] = claims.get(key, 0) + 1
+
+        await self.slot_counters.reserve_many(claims)
+        try:
+            await self._assign_stations(booking_dicts)
+        except Exception:
+            await self.slot_counters.release_many(claims)
+            raise
+        for booking, booking_dict in zip(bookings, booking_dicts):
+            booking.station = booking_dict.get('station')
+        try:
+            await self.collection.insert_many(booking_dicts, ordered=True)
+        except Exception:
+            # Drop whatever part of the group made it in before giving the capacity back
+            await self.collection.delete_many({"group_reference": group_reference})
+            await self._release_stations(booking_dicts)
+            await self.slot_counters.release_many(claims)
+            raise
+        await self._record_stats([(booking_dict, None, booking_dict['status']) for booking_dict in booking_dicts])
+
+        for booking_date, game_type in {(booking.date, booking.game_type) for booking in bookings}:
+            await self._notify_write(booking_date, game_type)
+
+        total = round(sum(booking.price for booking in bookings), 2)
+        logger.info(f"Created group {group_reference} with {len(bookings)} bookings - Price: ₹{total}")
+        return group_reference, bookings
+
     async def get_all_bookings(self) -> List[Booking]:
         """Get all bookings"""
         cursor = self.collection.find()
@@ -97,6 +249,107 @@ class BookingService:
                 bookings.append(Booking(**prepared))
         return bookings
 
+    @staticmethod
+    def encode_cursor(created_at: datetime, booking_id: str) -> str:
+        """Opaque continuation token for the (created_at, id) sort position"""
+        payload = json.dumps({"c": created_at.isoformat(), "i": booking_id}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(token: str) -> Tuple[datetime, str]:
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(payload["c"]), str(payload["i"])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def build_bookings_filter(date_from: Optional[date] = None, date_to: Optional[date] = None,
+                              status: Optional[str] = None, game_type: Optional[str] = None,
+                              phone: Optional[str] = None) -> Dict[str, Any]:
+        """MongoDB filter for the booking list/export filters; date_to is inclusive"""
+        query: Dict[str, Any] = {}
+        if date_from or date_to:
+            query["date"] = {}
+            if date_from:
+                query["date"]["$gte"] = datetime.combine(date_from, datetime.min.time())
+            if date_to:
+                query["date"]["$lt"] = datetime.combine(date_to, datetime.min.time()) + timedelta(days=1)
+        if status:
+            query["status"] = status
+        if game_type:
+            query["game_type"] = game_type
+        if phone:
+            query["phone"] = phone
+        return query
+
+    async def find_bookings_page(self, limit: int = 100, cursor: Optional[str] = None,
+                                 fields: Optional[List[str]] = None,
+                                 **filters) -> Tuple[List[Any], Optional[str]]:
+        """Get one page of bookings, newest first, and the token for the next page.
+
+        Pages are keyset-paginated on (created_at, id), so every page is an
+        index range scan no matter how deep into the history it is. With
+        `fields`, only those fields are fetched and plain dicts are returned.
+        """
+        query = self.build_bookings_filter(**filters)
+        if cursor:
+            created_at, booking_id = self.decode_cursor(cursor)
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "id": {"$lt": booking_id}},
+            ]
+
+        projection = None
+        if fields:
+            unknown = set(fields) - set(Booking.model_fields)
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+            projection = {"_id": 0, "created_at": 1, "id": 1, **{name: 1 for name in fields}}
+
+        docs = await self.collection.find(query, projection=projection) \
+            .sort([("created_at", -1), ("id", -1)]) \
+            .limit(limit + 1) \
+            .to_list(length=limit + 1)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = self.encode_cursor(docs[-1]["created_at"], docs[-1]["id"])
+
+        if fields:
+            items = [
+                {name: value for name, value in self._prepare_booking_doc(doc).items() if name in fields}
+                for doc in docs
+            ]
+        else:
+            items = [Booking(**self._prepare_booking_doc(doc)) for doc in docs]
+        return items, next_cursor
+
+    async def get_booking_counts(self) -> Dict[str, Any]:
+        """Total bookings and bookings per dashboard status.
+
+        The total comes from collection metadata and each status count from
+        the status index, so the cost does not grow with a full scan.
+        """
+        total, *status_counts = await asyncio.gather(
+            self.collection.estimated_document_count(),
+            *(self.collection.count_documents({"status": status}) for status in DASHBOARD_STATUSES)
+        )
+        return {"total": total, "by_status": dict(zip(DASHBOARD_STATUSES, status_counts))}
+
+    async def iter_booking_docs(self, batch_size: int = 500, **filters) -> AsyncIterator[dict]:
+        """Stream raw booking documents oldest first without materializing the result set"""
+        cursor = self.collection.find(
+            self.build_bookings_filter(**filters),
+            projection={"_id": 0},
+            batch_size=batch_size
+        ).sort([("created_at", 1), ("id", 1)])
+
+        async for booking_doc in cursor:
+            yield self._prepare_booking_doc(booking_doc)
+
     async def get_booking_by_id(self, booking_id: str) -> Optional[Booking]:
         """Get booking by ID"""
         booking_doc = await self.collection.find_one({"id": booking_id})
@@ -111,22 +364,251 @@ class BookingService:
                 return Booking(**prepared)
         return None
 
+    async def _release_capacity(self, booking_doc: dict):
+        """Give back the slots and the station held by an active booking"""
+        try:
+            slot_minutes = slot_minutes_for_booking(booking_doc['time_slot'], booking_doc.get('duration', 60))
+        except ValueError:
+            return
+        await self.slot_counters.release(booking_doc['date'], booking_doc['game_type'], slot_minutes)
+        await self._release_stations([booking_doc])
+
+    async def _find_and_update(self, booking_filter: dict, update: dict) -> Optional[dict]:
+        """Apply an update and return the document as it is afterwards, in one round trip"""
+        return await self.collection.find_one_and_update(
+            booking_filter, update, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+
     async def update_booking(self, booking_id: str, update_data: dict) -> Optional[Booking]:
-        """Update booking"""
+        """Update booking; returns None only if it does not exist"""
         update_data['updated_at'] = datetime.utcnow()
-        result = await self.collection.update_one(
-            {"id": booking_id},
-            {"$set": update_data}
+        update = {"$set": update_data}
+        new_status = update_data.get('status')
+
+        if new_status is None:
+            booking_doc = await self._find_and_update({"id": booking_id}, update)
+        else:
+            booking_doc = await self._update_booking_status(booking_id, new_status, update)
+        if not booking_doc:
+            return None
+
+        booking = Booking(**self._prepare_booking_doc(booking_doc))
+        await self._notify_write(booking.date, booking.game_type)
+        return booking
+
+    async def _update_booking_status(self, booking_id: str, new_status: str, update: dict,
+                                     attempts: int = 3) -> Optional[dict]:
+        """Apply a status change and move capacity to match.
+
+        Each attempt pins the update to the booking being active or cancelled,
+        so the capacity change always matches the transition that happened.
+        """
+        for _ in range(attempts):
+            # Usual case: an active booking; only a cancellation moves capacity
+            booking_doc = await self._find_and_update({"id": booking_id, "status": {"$ne": "cancelled"}}, update)
+            if booking_doc:
+                if new_status == 'cancelled':
+                    await self._release_capacity(booking_doc)
+                    await self._record_stats([(booking_doc, 'active', 'cancelled')])
+                return booking_doc
+
+            if new_status == 'cancelled':
+                # Already cancelled, so capacity stays as it is
+                booking_doc = await self._find_and_update({"id": booking_id, "status": "cancelled"}, update)
+                if booking_doc:
+                    return booking_doc
+            else:
+                current_doc = await self.collection.find_one(
+                    {"id": booking_id},
+                    projection={"_id": 0, "id": 1, "date": 1, "game_type": 1, "time_slot": 1, "duration": 1,
+                                "start_minute": 1, "status": 1}
+                )
+                if current_doc and current_doc.get('status') == 'cancelled':
+                    # Reactivating: take the slots and a station back before the booking counts again
+                    slot_minutes = slot_minutes_for_booking(current_doc['time_slot'], current_doc.get('duration', 60))
+                    await self.slot_counters.reserve(current_doc['date'], current_doc['game_type'], slot_minutes)
+                    try:
+                        await self._assign_stations([current_doc])
+                    except Exception:
+                        await self.slot_counters.release(current_doc['date'], current_doc['game_type'], slot_minutes)
+                        raise
+                    reactivate = {"$set": {**update["$set"], "station": current_doc.get('station')}}
+                    booking_doc = await self._find_and_update({"id": booking_id, "status": "cancelled"}, reactivate)
+                    if booking_doc:
+                        await self._record_stats([(booking_doc, 'cancelled', new_status)])
+                        return booking_doc
+                    await self._release_stations([current_doc])
+                    await self.slot_counters.release(current_doc['date'], current_doc['game_type'], slot_minutes)
+
+            if not await self.collection.count_documents({"id": booking_id}, limit=1):
+                return None
+            # The booking changed between our writes; try again against its new status
+        raise RuntimeError(f"Booking {booking_id} kept changing while updating its status")
+
+    async def cancel_booking_by_reference(self, reference_number: str,
+                                          notice: timedelta = timedelta(hours=1)) -> Optional[Booking]:
+        """Cancel an active booking at least `notice` before its session starts.
+
+        The status and deadline checks are part of the update filter, so
+        concurrent cancellations cannot both succeed. Returns None if there
+        is no such booking and raises ValueError if it cannot be cancelled.
+        """
+        # Session start as venue wall-clock milliseconds since the epoch: the
+        # booking's date plus its start minute, compared with the venue's "now"
+        epoch = datetime(1970, 1, 1)
+        latest_start_ms = int((venue_now() + notice - epoch).total_seconds() * 1000)
+        session_start_ms = {"$add": [
+            {"$subtract": ["$date", epoch]},
+            {"$multiply": [{"$ifNull": ["$start_minute", 0]}, 60 * 1000]}
+        ]}
+        booking_doc = await self._find_and_update(
+            {
+                "reference_number": reference_number,
+                "status": {"$ne": "cancelled"},
+                "$expr": {"$gt": [session_start_ms, latest_start_ms]}
+            },
+            {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}}
         )
 
-        if result.modified_count > 0:
-            return await self.get_booking_by_id(booking_id)
-        return None
+        if not booking_doc:
+            # Nothing matched; read once to tell the caller why
+            current_doc = await self.collection.find_one(
+                {"reference_number": reference_number}, projection={"_id": 0, "status": 1}
+            )
+            if not current_doc:
+                return None
+            if current_doc.get('status') == 'cancelled':
+                raise ValueError("Booking is already cancelled")
+            raise ValueError("Cancellation not allowed. Must cancel at least 1 hour before session time.")
+
+        await self._release_capacity(booking_doc)
+        await self._record_stats([(booking_doc, 'active', 'cancelled')])
+        booking = Booking(**self._prepare_booking_doc(booking_doc))
+        await self._notify_write(booking.date, booking.game_type)
+        logger.info(f"Cancelled booking {reference_number}")
+        return booking
 
     async def delete_booking(self, booking_id: str) -> bool:
         """Delete booking"""
-        result = await self.collection.delete_one({"id": booking_id})
-        return result.deleted_count > 0
+        deleted_doc = await self.collection.find_one_and_delete(
+            {"id": booking_id},
+            projection={"id": 1, "date": 1, "game_type": 1, "time_slot": 1, "duration": 1, "start_minute": 1,
+                        "status": 1, "price": 1, "station": 1}
+        )
+        if not deleted_doc:
+            return False
+        if deleted_doc.get('status') != 'cancelled':
+            await self._release_capacity(deleted_doc)
+        await self._record_stats([(deleted_doc, deleted_doc.get('status', 'pending'), None)])
+        await self._notify_write(deleted_doc.get('date'), deleted_doc.get('game_type'))
+        return True
+
+    async def bulk_update_status(self, new_status: str, ids: Optional[List[str]] = None,
+                                 max_bookings: int = 1000, **filters) -> List[Dict[str, Any]]:
+        """Set the status of many bookings at once, selected by id and/or list filters.
+
+        Matching bookings are read once, capacity is moved for cancellations
+        and reactivations, and the status changes go out in one unordered
+        bulk_write, each pinned to the status that was read. Returns one
+        {"id", "result"} entry per requested or matched booking, where result
+        is "updated", "unchanged", "not_found" or "conflict".
+        """
+        query = self.build_bookings_filter(**filters)
+        if ids is not None:
+            query["id"] = {"$in": list(ids)}
+        elif not query:
+            raise ValueError("Provide booking ids or at least one filter")
+
+        docs = await self.collection.find(
+            query,
+            projection={"_id": 0, "id": 1, "date": 1, "game_type": 1, "time_slot": 1, "duration": 1,
+                        "start_minute": 1, "status": 1, "price": 1, "station": 1}
+        ).limit(max_bookings + 1).to_list(length=max_bookings + 1)
+        if len(docs) > max_bookings:
+            raise ValueError(f"More than {max_bookings} bookings match; narrow the selection")
+
+        # BSON dates keep milliseconds; this timestamp identifies the writes made by this call
+        current_time = datetime.utcnow()
+        current_time = current_time.replace(microsecond=current_time.microsecond // 1000 * 1000)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        pending: List[dict] = []
+        reserved_ids = set()
+        for doc in docs:
+            old_status = doc.get('status')
+            if old_status == new_status:
+                results[doc['id']] = {"id": doc['id'], "result": "unchanged"}
+                continue
+            if old_status == 'cancelled':
+                # Reactivating takes capacity and a station back; bookings that no longer fit are skipped
+                try:
+                    slot_minutes = slot_minutes_for_booking(doc['time_slot'], doc.get('duration', 60))
+                    await self.slot_counters.reserve(doc['date'], doc['game_type'], slot_minutes)
+                except ValueError as e:
+                    results[doc['id']] = {"id": doc['id'], "result": "conflict", "detail": str(e)}
+                    continue
+                try:
+                    await self._assign_stations([doc])
+                except CapacityError as e:
+                    await self.slot_counters.release(doc['date'], doc['game_type'], slot_minutes)
+                    results[doc['id']] = {"id": doc['id'], "result": "conflict", "detail": str(e)}
+                    continue
+                reserved_ids.add(doc['id'])
+            pending.append(doc)
+
+        applied_ids = set()
+        if pending:
+            result = await self.collection.bulk_write([
+                UpdateOne(
+                    {"id": doc['id'], "status": doc.get('status')},
+                    {"$set": {"status": new_status, "updated_at": current_time,
+                              **({"station": doc.get('station')} if doc['id'] in reserved_ids else {})}}
+                )
+                for doc in pending
+            ], ordered=False)
+            if result.modified_count == len(pending):
+                applied_ids = {doc['id'] for doc in pending}
+            else:
+                # Some bookings changed under us; find out which writes were ours
+                applied_ids = {
+                    doc['id'] async for doc in self.collection.find(
+                        {"id": {"$in": [doc['id'] for doc in pending]}, "updated_at": current_time},
+                        projection={"_id": 0, "id": 1}
+                    )
+                }
+
+        release_claims: Dict[Tuple[date, str, int], int] = {}
+        release_stations: List[dict] = []
+        applied_transitions = []
+        touched = set()
+        for doc in pending:
+            applied = doc['id'] in applied_ids
+            reactivated = doc['id'] in reserved_ids
+            results[doc['id']] = {"id": doc['id'], "result": "updated" if applied else "conflict"}
+            if applied:
+                touched.add((as_date(doc['date']), doc['game_type']))
+                applied_transitions.append((doc, doc.get('status'), new_status))
+            # Release slots for applied cancellations and for reactivations that lost a race
+            if (applied and new_status == 'cancelled') or (reactivated and not applied):
+                try:
+                    slot_minutes = slot_minutes_for_booking(doc['time_slot'], doc.get('duration', 60))
+                except ValueError:
+                    continue
+                for minute in slot_minutes:
+                    key = (as_date(doc['date']), doc['game_type'], minute)
+                    release_claims[key] = release_claims.get(key, 0) + 1
+                release_stations.append(doc)
+        await self.slot_counters.release_many(release_claims)
+        await self._release_stations(release_stations)
+        await self._record_stats(applied_transitions)
+
+        for booking_date, game_type in touched:
+            await self._notify_write(booking_date, game_type)
+
+        logger.info(f"Bulk status update to {new_status}: {len(applied_ids)} of {len(docs)} bookings changed")
+        if ids is None:
+            return list(results.values())
+        return [results.get(booking_id, {"id": booking_id, "result": "not_found"}) for booking_id in ids]
 
     async def get_booking_by_reference(self, reference_number: str) -> Optional[Booking]:
         """Get booking by reference number"""
@@ -173,114 +655,280 @@ class BookingService:
             bookings.append(Booking(**booking_doc))
         return bookings
 
+    async def get_occupancy_records(self, date: datetime, game_type: str,
+                                    start_minute: Optional[int] = None,
+                                    end_minute: Optional[int] = None) -> List[OccupancyRecord]:
+        """Active bookings for a date and game type as lean occupancy records.
+
+        With start_minute/end_minute, only bookings overlapping
+        [start_minute, end_minute) are fetched, plus any not yet backfilled
+        with minute offsets; those are placed from their time_slot label.
+        """
+        start_date = datetime.combine(date.date(), datetime.min.time())
+        end_date = start_date + timedelta(days=1)
+
+        query = {
+            "date": {
+                "$gte": start_date,
+                "$lt": end_date
+            },
+            "game_type": game_type,
+            "status": {"$ne": "cancelled"}
+        }
+        if start_minute is not None and end_minute is not None:
+            query["$or"] = [
+                {"start_minute": {"$lt": end_minute}, "end_minute": {"$gt": start_minute}},
+                {"start_minute": {"$exists": False}},
+            ]
+
+        cursor = self.collection.find(query, projection=OccupancyRecord.PROJECTION)
+        return [OccupancyRecord.from_doc(doc) async for doc in cursor]
+
+    async def iter_occupancy_records_in_range(self, from_date: date, to_date: date,
+                                              game_types: Iterable[str]) -> AsyncIterator[OccupancyRecord]:
+        """Stream active bookings for the game types from from_date through to_date, sorted by date"""
+        start_date = datetime.combine(from_date, datetime.min.time())
+        end_date = datetime.combine(to_date, datetime.min.time()) + timedelta(days=1)
+
+        cursor = self.collection.find({
+            "date": {
+                "$gte": start_date,
+                "$lt": end_date
+            },
+            "game_type": {"$in": list(game_types)},
+            "status": {"$ne": "cancelled"}
+        }, projection=OccupancyRecord.PROJECTION).sort("date", 1)
+
+        async for doc in cursor:
+            yield OccupancyRecord.from_doc(doc)
+
 class AvailabilityService:
-    def __init__(self, booking_service: BookingService):
+    def __init__(self, booking_service: BookingService, cache: Optional[AvailabilityCache] = None):
         self.booking_service = booking_service
+        self.cache = cache
 
     def generate_time_slots(self) -> List[str]:
         """Generate 30-minute interval time slots"""
-        slots = []
-        current_time = time(START_TIME, 0)
-        end_time = time(END_TIME, 0)
-
-        while current_time < end_time:
-            # Format time as 12-hour format
-            hour = current_time.hour
-            minute = current_time.minute
-            am_pm = "AM" if hour < 12 else "PM"
-            display_hour = hour if hour <= 12 else hour - 12
-            if display_hour == 0:
-                display_hour = 12
-
-            time_str = f"{display_hour}:{minute:02d} {am_pm}"
-            slots.append(time_str)
-
-            # Add 30 minutes
-            total_minutes = current_time.hour * 60 + current_time.minute + SLOT_INTERVAL
-            new_hour = total_minutes // 60
-            new_minute = total_minutes % 60
-            current_time = time(new_hour, new_minute)
-
-        return slots
+        return list(SLOT_LABELS)
 
     def get_slots_for_duration(self, start_slot: str, duration: int) -> List[str]:
         """Get all slots needed for a booking duration"""
-        all_slots = self.generate_time_slots()
-        if start_slot not in all_slots:
+        start_index = SLOT_INDEX.get(start_slot)
+        if start_index is None:
             return []
+        return [SLOT_LABELS[index] for index in slot_range(start_index, duration)]
 
-        start_index = all_slots.index(start_slot)
-        num_slots = duration // SLOT_INTERVAL
+    @staticmethod
+    def _start_index(booking: OccupancyRecord) -> Optional[int]:
+        """Slot index a booking starts at, from its stored minute offset or its label"""
+        if booking.start_minute is not None:
+            return MINUTE_INDEX.get(booking.start_minute)
+        return SLOT_INDEX.get(booking.time_slot)
 
-        return all_slots[start_index:start_index + num_slots]
+    def build_occupancy(self, bookings: Iterable[OccupancyRecord]) -> OccupancyMatrix:
+        """Build the day's occupancy matrix from its bookings (records or Booking models)"""
+        occupancy = OccupancyMatrix(NUM_SLOTS)
+
+        starts: Dict[str, List[int]] = {}
+        lengths: Dict[str, List[int]] = {}
+        for booking in bookings:
+            if booking.status == 'cancelled':
+                continue
+            start_index = self._start_index(booking)
+            if start_index is None:
+                continue
+            starts.setdefault(booking.game_type, []).append(start_index)
+            lengths.setdefault(booking.game_type, []).append(slot_count(booking.duration))
+
+        for game_type in starts:
+            occupancy.add_bookings(game_type, starts[game_type], lengths[game_type])
+        return occupancy
+
+    def slot_availability(self, game_type: str, duration: int,
+                          records: List[OccupancyRecord]) -> Tuple[np.ndarray, np.ndarray]:
+        """(available, booked) for every start slot of a session of `duration` minutes"""
+        max_capacity = RESOURCE_CAPACITY.get(game_type, 1)
+        window = slot_count(duration)
+        available, booked = self.build_occupancy(records).availability(game_type, window, max_capacity)
+        if is_station_tracked(game_type):
+            # Free units spread over several stations cannot host one session
+            schedule = StationSchedule.from_bookings(max_capacity, records)
+            available = available & (schedule.free_counts(window) > 0)
+        return available, booked
 
     async def check_capacity_for_slot(self, date: datetime, time_slot: str, game_type: str, duration: int) -> Dict:
         """Check capacity for a specific time slot considering duration"""
-        # Get all bookings for this date and game type
-        bookings = await self.booking_service.get_bookings_by_date_and_game_type(date, game_type)
-
-        # Get required slots for this duration
-        required_slots = self.get_slots_for_duration(time_slot, duration)
-
-        # Count bookings for each required slot
         max_capacity = RESOURCE_CAPACITY.get(game_type, 1)
+        index = SLOT_INDEX.get(time_slot)
+        if index is None:
+            return {"available": True, "booked": 0, "capacity": max_capacity}
 
-        # Check each required slot
-        for slot in required_slots:
-            slot_bookings = 0
-            for booking in bookings:
-                # Check if this booking overlaps with this slot
-                booking_slots = self.get_slots_for_duration(booking.time_slot, booking.duration)
-                if slot in booking_slots:
-                    slot_bookings += 1
-
-            # If any slot is full, the time slot is not available
-            if slot_bookings >= max_capacity:
-                return {
-                    "available": False,
-                    "booked": slot_bookings,
-                    "capacity": max_capacity
-                }
-
-        # All slots available
-        slot_bookings = 0
-        for booking in bookings:
-            booking_slots = self.get_slots_for_duration(booking.time_slot, booking.duration)
-            if time_slot in booking_slots:
-                slot_bookings += 1
+        # Only bookings overlapping the requested window can affect it
+        start_minute, end_minute, _ = booking_span(time_slot, duration)
+        end_minute = max(end_minute, start_minute + SLOT_INTERVAL)
+        records = await self.booking_service.get_occupancy_records(date, game_type, start_minute, end_minute)
+        available, booked = self.slot_availability(game_type, duration, records)
 
         return {
-            "available": True,
-            "booked": slot_bookings,
+            "available": bool(available[index]),
+            "booked": int(booked[index]),
             "capacity": max_capacity
         }
 
-    async def get_availability(self, date: datetime, game_type: str = None, duration: int = 60) -> AvailabilityResponse:
-        """Get availability for a specific date, optionally filtered by game type"""
-        time_slots = []
+    async def get_availability(self, date: datetime, game_type: str = None, duration: int = 60,
+                               version: Optional[int] = None) -> AvailabilityResponse:
+        """Get availability for a specific date, optionally filtered by game type.
+
+        With `version`, cached results computed for an older version are
+        never returned, even if another worker's write has not evicted them yet.
+        """
+        cache_key = (as_date(date), game_type, duration)
+        if version is not None:
+            cache_key += (version,)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        availability = await self._compute_availability(date, game_type, duration)
+        if self.cache is not None:
+            self.cache.set(cache_key, availability)
+        return availability
+
+    async def _compute_availability(self, date: datetime, game_type: str = None, duration: int = 60) -> AvailabilityResponse:
+        if not game_type:
+            return self._availability_from_records(date.date(), None, duration, [])
+
+        # Fetch the day's bookings once and answer every slot from the same occupancy
+        records = await self.booking_service.get_occupancy_records(date, game_type)
+        return self._availability_from_records(date.date(), game_type, duration, records)
+
+    def _availability_from_records(self, day: date, game_type: Optional[str], duration: int,
+                                   records: List[OccupancyRecord]) -> AvailabilityResponse:
         all_time_slots = self.generate_time_slots()
 
-        for slot in all_time_slots:
-            if game_type:
-                capacity_info = await self.check_capacity_for_slot(date, slot, game_type, duration)
-                time_slots.append(TimeSlot(
-                    time=slot,
-                    available=capacity_info["available"],
-                    booked=capacity_info["booked"],
-                    capacity=capacity_info["capacity"]
-                ))
-            else:
-                # If no game type specified, check if any resource is available
-                time_slots.append(TimeSlot(
-                    time=slot,
-                    available=True  # Simplified for now
-                ))
+        if not game_type:
+            # If no game type specified, check if any resource is available
+            time_slots = [TimeSlot(time=slot, available=True) for slot in all_time_slots]  # Simplified for now
+            return AvailabilityResponse(date=day, time_slots=time_slots)
+
+        max_capacity = RESOURCE_CAPACITY.get(game_type, 1)
+        available, booked = self.slot_availability(game_type, duration, records)
+
+        time_slots = [
+            TimeSlot(
+                time=slot,
+                available=bool(available[index]),
+                booked=int(booked[index]),
+                capacity=max_capacity
+            )
+            for index, slot in enumerate(all_time_slots)
+        ]
 
         return AvailabilityResponse(
-            date=date.date(),
+            date=day,
             time_slots=time_slots
         )
 
+    async def iter_availability_range(self, from_date: date, to_date: date, game_type: str = None,
+                                      duration: int = 60) -> AsyncIterator[AvailabilityResponse]:
+        """Yield availability for every day in [from_date, to_date], in order.
+
+        All bookings in the range come from one date-sorted query; each day is
+        yielded as soon as the cursor moves past it, so callers can stream the
+        first days before the last ones are loaded.
+        """
+        # Days are not cached here: single-day reads are keyed by availability
+        # version, and entries without one would only evict live ones
+        def finish_day(day: date, records: List[OccupancyRecord]) -> AvailabilityResponse:
+            return self._availability_from_records(day, game_type, duration, records)
+
+        current_day = from_date
+        day_records: List[OccupancyRecord] = []
+        if game_type:
+            async for record in self.booking_service.iter_occupancy_records_in_range(from_date, to_date, [game_type]):
+                while record.date > current_day:
+                    yield finish_day(current_day, day_records)
+                    day_records = []
+                    current_day += timedelta(days=1)
+                day_records.append(record)
+
+        while current_day <= to_date:
+            yield finish_day(current_day, day_records)
+            day_records = []
+            current_day += timedelta(days=1)
+
+    async def find_earliest_slots(self, start: datetime, duration: int, game_types: List[str],
+                                  horizon_days: int = 7, limit: int = 5, units: int = 1) -> List[Dict]:
+        """First `limit` (date, time, game_type) options with `units` free for the whole session.
+
+        Options start at or after `start`, within `horizon_days` days, and
+        end by closing time. Every active booking in the horizon is loaded with
+        one query into a (days x slots) occupancy array per game type, and all
+        days and game types are searched together, earliest first.
+        """
+        window = slot_count(duration)
+        if window <= 0:
+            raise ValueError(f"Duration must be at least {SLOT_INTERVAL} minutes")
+        if units < 1:
+            raise ValueError("units must be at least 1")
+
+        first_day = start.date()
+        last_day = first_day + timedelta(days=horizon_days - 1)
+        occupancy = {game_type: RangeOccupancy(horizon_days, NUM_SLOTS) for game_type in game_types}
+        bookings: Dict[str, Tuple[List[int], List[int], List[int]]] = {
+            game_type: ([], [], []) for game_type in game_types
+        }
+        stations: Dict[str, List[StationSchedule]] = {
+            game_type: [StationSchedule(RESOURCE_CAPACITY.get(game_type, 1)) for _ in range(horizon_days)]
+            for game_type in game_types if is_station_tracked(game_type)
+        }
+        async for record in self.booking_service.iter_occupancy_records_in_range(first_day, last_day, game_types):
+            start_index = self._start_index(record)
+            if start_index is None or record.status == 'cancelled':
+                continue
+            days, starts, lengths = bookings[record.game_type]
+            day = (record.date - first_day).days
+            days.append(day)
+            starts.append(start_index)
+            lengths.append(slot_count(record.duration))
+            schedules = stations.get(record.game_type)
+            span = booking_slot_span(record)
+            if schedules is not None and record.station is not None and span[0] < span[1] \
+                    and 1 <= record.station <= schedules[day].num_stations:
+                schedules[day].add(record.station, *span)
+        for game_type, (days, starts, lengths) in bookings.items():
+            occupancy[game_type].add_bookings(days, starts, lengths)
+
+        # Slots on the first day that start before `start` are already gone
+        first_slot = bisect_left(SLOT_MINUTES, start.hour * 60 + start.minute)
+        positions, orders, free_counts = [], [], []
+        for order, game_type in enumerate(game_types):
+            free = occupancy[game_type].free_units(window, RESOURCE_CAPACITY.get(game_type, 1))
+            if game_type in stations:
+                # A session needs one station free throughout, not just free units in every slot
+                free = np.minimum(free, np.stack([schedule.free_counts(window) for schedule in stations[game_type]]))
+            free[0, :first_slot] = 0
+            day_indices, slot_indices = np.nonzero(free >= units)
+            positions.append(day_indices * NUM_SLOTS + slot_indices)
+            orders.append(np.full(day_indices.size, order))
+            free_counts.append(free[day_indices, slot_indices])
+
+        positions = np.concatenate(positions)
+        orders = np.concatenate(orders)
+        free_counts = np.concatenate(free_counts)
+        best = np.lexsort((orders, positions))[:limit]
+
+        return [
+            {
+                "date": (first_day + timedelta(days=int(positions[i] // NUM_SLOTS))).isoformat(),
+                "time": SLOT_LABELS[int(positions[i] % NUM_SLOTS)],
+                "game_type": game_types[int(orders[i])],
+                "available_units": int(free_counts[i]),
+            }
+            for i in best
+        ]
+
 # Rest of the services remain the same...
 class GameTypeService:
     def __init__(self, db: AsyncIOMotorDatabase):
@@ -306,6 +954,11 @@ class GalleryService:
             images.append(GalleryImage(**doc))
         return images
 
+    async def create_image(self, image_data: dict) -> GalleryImage:
+        image = GalleryImage(id=str(uuid.uuid4()), **image_data)
+        await self.collection.insert_one(image.model_dump())
+        return image
+
 class SettingsService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
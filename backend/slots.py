@@ -0,0 +1,74 @@
+"""Precompiled time slot grid.
+
+The day's slots are built once from START_TIME, END_TIME and SLOT_INTERVAL.
+Services work with integer slot indices; display labels such as "10:30 AM"
+are only converted at the API edges.
+"""
+from datetime import datetime
+from typing import Dict, List, Tuple
+from zoneinfo import ZoneInfo
+
+from config import END_TIME, SLOT_INTERVAL, START_TIME, VENUE_TIMEZONE
+
+OPENING_MINUTE = START_TIME * 60
+CLOSING_MINUTE = END_TIME * 60
+
+VENUE_TZ = ZoneInfo(VENUE_TIMEZONE)
+
+
+def venue_now() -> datetime:
+    """Current venue wall-clock time, naive like booking dates and slot minutes"""
+    return datetime.now(VENUE_TZ).replace(tzinfo=None)
+
+
+def format_slot_label(minute: int) -> str:
+    """Format a minute-of-day offset as a 12-hour slot label, e.g. 630 -> "10:30 AM" """
+    hour, minute = divmod(minute, 60)
+    am_pm = "AM" if hour < 12 else "PM"
+    display_hour = hour if hour <= 12 else hour - 12
+    if display_hour == 0:
+        display_hour = 12
+    return f"{display_hour}:{minute:02d} {am_pm}"
+
+
+SLOT_MINUTES: Tuple[int, ...] = tuple(range(OPENING_MINUTE, CLOSING_MINUTE, SLOT_INTERVAL))
+SLOT_LABELS: Tuple[str, ...] = tuple(format_slot_label(minute) for minute in SLOT_MINUTES)
+SLOT_INDEX: Dict[str, int] = {label: index for index, label in enumerate(SLOT_LABELS)}
+MINUTE_INDEX: Dict[int, int] = {minute: index for index, minute in enumerate(SLOT_MINUTES)}
+NUM_SLOTS = len(SLOT_MINUTES)
+
+
+def slot_index(label: str) -> int:
+    """Index of a slot label; raises ValueError for times that are not on the grid"""
+    index = SLOT_INDEX.get(label)
+    if index is not None:
+        return index
+
+    # Tolerate spacing/case variants such as "10:30am" before giving up
+    try:
+        parsed = datetime.strptime(label.strip().upper().replace(" ", ""), "%I:%M%p")
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid time slot: {label}")
+    index = MINUTE_INDEX.get(parsed.hour * 60 + parsed.minute)
+    if index is None:
+        raise ValueError(f"Invalid time slot: {label}")
+    return index
+
+
+def slot_count(duration: int) -> int:
+    """Number of slots a booking of `duration` minutes covers"""
+    return max(duration, 0) // SLOT_INTERVAL
+
+
+def slot_range(start_index: int, duration: int) -> range:
+    """Indices covered by a booking, truncated at closing time"""
+    return range(start_index, min(start_index + slot_count(duration), NUM_SLOTS))
+
+
+def booking_span(time_slot: str, duration: int) -> Tuple[int, int, List[int]]:
+    """(start_minute, end_minute, slot indices) a booking occupies, truncated at closing time"""
+    start_index = slot_index(time_slot)
+    indices = list(slot_range(start_index, duration))
+    start_minute = SLOT_MINUTES[start_index]
+    end_minute = min(start_minute + len(indices) * SLOT_INTERVAL, CLOSING_MINUTE)
+    return start_minute, end_minute, indices
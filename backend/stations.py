@@ -0,0 +1,262 @@
+"""Station-level assignment for bookings.
+
+RESOURCE_CAPACITY counts interchangeable units, but a customer sits at one
+station for the whole session. For the game types in STATION_GAME_TYPES,
+every booking is assigned a concrete station number (1..capacity).
+
+Assignment is best fit. Of the stations free for the whole session, it picks
+the one whose idle gap around the session is smallest, so short holes fill
+up first and long runs stay free for long sessions. Each station keeps its
+busy intervals in sorted lists, so a station is checked with one bisect.
+
+Claims are atomic through `station_slots`, which has one document per
+(date, game_type, station, slot) with a deterministic `_id`. Two requests
+picking the same station collide on the insert, and the loser retries
+against the updated schedule.
+
+Bookings made before stations existed get one from
+`python migrations.py assign-stations`.
+"""
+from bisect import bisect_right
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from cache import as_date
+from capacity import CapacityError, DUPLICATE_KEY_ERROR
+from config import RESOURCE_CAPACITY, STATION_GAME_TYPES
+from slots import MINUTE_INDEX, NUM_SLOTS, SLOT_INDEX, SLOT_MINUTES, slot_count
+
+logger = logging.getLogger(__name__)
+
+
+def is_station_tracked(game_type: str) -> bool:
+    return game_type in STATION_GAME_TYPES
+
+
+def booking_slot_span(booking) -> Optional[Tuple[int, int]]:
+    """[start, end) slot indices of a booking (record, model or document), truncated at closing"""
+    get = booking.get if isinstance(booking, dict) else lambda name, default=None: getattr(booking, name, default)
+    start_minute = get("start_minute")
+    start = MINUTE_INDEX.get(start_minute) if start_minute is not None else SLOT_INDEX.get(get("time_slot"))
+    if start is None:
+        return None
+    return start, min(start + slot_count(get("duration", 60)), NUM_SLOTS)
+
+
+class StationSchedule:
+    """Busy intervals of every station of one game type on one day"""
+
+    def __init__(self, num_stations: int, num_slots: int = NUM_SLOTS):
+        self.num_stations = num_stations
+        self.num_slots = num_slots
+        # Per station, parallel sorted lists of interval starts and ends
+        self._starts: List[List[int]] = [[] for _ in range(num_stations)]
+        self._ends: List[List[int]] = [[] for _ in range(num_stations)]
+
+    @classmethod
+    def from_bookings(cls, num_stations: int, bookings: Iterable) -> "StationSchedule":
+        """Schedule from active bookings that carry a station"""
+        schedule = cls(num_stations)
+        for booking in bookings:
+            station = getattr(booking, "station", None)
+            span = booking_slot_span(booking)
+            if station is None or span is None or getattr(booking, "status", None) == "cancelled":
+                continue
+            if 1 <= station <= num_stations and span[0] < span[1]:
+                schedule.add(station, *span)
+        return schedule
+
+    def add(self, station: int, start: int, end: int):
+        starts, ends = self._starts[station - 1], self._ends[station - 1]
+        position = bisect_right(starts, start)
+        starts.insert(position, start)
+        ends.insert(position, end)
+
+    def _gap(self, station: int, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """(previous end, next start) around [start, end), or None if the station is busy then"""
+        starts, ends = self._starts[station - 1], self._ends[station - 1]
+        position = bisect_right(starts, start)
+        if position > 0 and ends[position - 1] > start:
+            return None
+        if position < len(starts) and starts[position] < end:
+            return None
+        previous_end = ends[position - 1] if position > 0 else 0
+        next_start = starts[position] if position < len(starts) else self.num_slots
+        return previous_end, next_start
+
+    def is_free(self, station: int, start: int, end: int) -> bool:
+        return self._gap(station, start, end) is not None
+
+    def best_fit(self, start: int, end: int, exclude: Sequence[int] = ()) -> Optional[int]:
+        """Free station leaving the least idle time around [start, end); lowest number on ties"""
+        best_station, best_idle = None, None
+        for station in range(1, self.num_stations + 1):
+            if station in exclude:
+                continue
+            gap = self._gap(station, start, end)
+            if gap is None:
+                continue
+            idle = (start - gap[0]) + (gap[1] - end)
+            if best_idle is None or idle < best_idle:
+                best_station, best_idle = station, idle
+        return best_station
+
+    def free_counts(self, window: int) -> np.ndarray:
+        """Number of stations free for `window` slots from each start slot.
+
+        Windows are truncated at closing time, like pool availability.
+        """
+        busy = np.zeros((self.num_stations, self.num_slots + 1), dtype=np.int32)
+        for index in range(self.num_stations):
+            if self._starts[index]:
+                np.add.at(busy[index], self._starts[index], 1)
+                np.add.at(busy[index], self._ends[index], -1)
+        busy = np.cumsum(busy[:, :-1], axis=1) > 0
+
+        # Busy slots in [s, s + window) per station, via prefix sums
+        window = max(window, 1)
+        prefix = np.concatenate([np.zeros((self.num_stations, 1), dtype=np.int32),
+                                 np.cumsum(busy, axis=1, dtype=np.int32)], axis=1)
+        starts = np.arange(self.num_slots)
+        ends = np.minimum(starts + window, self.num_slots)
+        busy_in_window = prefix[:, ends] - prefix[:, starts]
+        return (busy_in_window == 0).sum(axis=0)
+
+
+class StationAssigner:
+    def __init__(self, db):
+        self.collection = db.station_slots
+
+    @staticmethod
+    def _claim_id(day: date, game_type: str, station: int, slot_minute: int) -> str:
+        return f"{day.isoformat()}|{game_type}|{station}|{slot_minute}"
+
+    async def load_schedule(self, booking_date, game_type: str) -> StationSchedule:
+        """Current claims for a day, including bookings still being written"""
+        day = as_date(booking_date)
+        schedule = StationSchedule(RESOURCE_CAPACITY.get(game_type, 1))
+        cursor = self.collection.find(
+            {"date": datetime.combine(day, datetime.min.time()), "game_type": game_type},
+            projection={"_id": 0, "station": 1, "slot_minute": 1}
+        )
+        async for claim in cursor:
+            index = MINUTE_INDEX.get(claim["slot_minute"])
+            if index is not None and 1 <= claim["station"] <= schedule.num_stations:
+                schedule.add(claim["station"], index, index + 1)
+        return schedule
+
+    def _claim_docs(self, day: date, game_type: str, station: int, span: Tuple[int, int], booking_id: str) -> List[dict]:
+        return [
+            {
+                "_id": self._claim_id(day, game_type, station, SLOT_MINUTES[index]),
+                "date": datetime.combine(day, datetime.min.time()),
+                "game_type": game_type,
+                "station": station,
+                "slot_minute": SLOT_MINUTES[index],
+                "booking_id": booking_id,
+            }
+            for index in range(*span)
+        ]
+
+    async def assign(self, booking_date, game_type: str, spans: Sequence[Tuple[int, int]],
+                     booking_ids: Sequence[str], attempts: int = 3) -> List[int]:
+        """Claim a station for every [start, end) span, all or nothing.
+
+        Returns the station numbers in the order of `spans`; raises
+        CapacityError if some span has no station free for its whole length.
+        """
+        day = as_date(booking_date)
+        for _ in range(attempts):
+            schedule = await self.load_schedule(day, game_type)
+            stations = []
+            docs = []
+            for span, booking_id in zip(spans, booking_ids):
+                station = schedule.best_fit(*span)
+                if station is None:
+                    raise CapacityError(
+                        f"No single {game_type} station is free for the whole session at "
+                        f"{SLOT_MINUTES[span[0]] // 60:02d}:{SLOT_MINUTES[span[0]] % 60:02d} on {day.isoformat()}"
+                    )
+                schedule.add(station, *span)
+                stations.append(station)
+                docs.extend(self._claim_docs(day, game_type, station, span, booking_id))
+
+            if not docs:
+                return stations
+            try:
+                await self.collection.insert_many(docs, ordered=True)
+                return stations
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                failed_index = write_errors[0]["index"] if write_errors else 0
+                # Ordered inserts stop at the first error; undo what went through
+                inserted = [doc["_id"] for doc in docs[:failed_index]]
+                if inserted:
+                    await self.collection.delete_many({"_id": {"$in": inserted}})
+                if not write_errors or write_errors[0].get("code") != DUPLICATE_KEY_ERROR:
+                    raise
+                # Another booking claimed one of these stations first; plan again
+        raise CapacityError(f"Could not claim a {game_type} station on {day.isoformat()}; please retry")
+
+    async def release(self, booking_date, game_type: str, station: int, span: Tuple[int, int], booking_id: str):
+        """Give back the slots a booking holds on its station"""
+        day = as_date(booking_date)
+        await self.collection.delete_many({
+            "_id": {"$in": [self._claim_id(day, game_type, station, SLOT_MINUTES[index]) for index in range(*span)]},
+            "booking_id": booking_id,
+        })
+
+    async def rebuild(self, bookings_collection, from_date: date) -> int:
+        """Assign stations to every active booking from `from_date` on and recreate the claims.
+
+        Bookings keep their station while it is still free; the rest are
+        packed best fit in start order.
+        """
+        start = datetime.combine(from_date, datetime.min.time())
+        cursor = bookings_collection.find(
+            {"date": {"$gte": start}, "game_type": {"$in": list(STATION_GAME_TYPES)}, "status": {"$ne": "cancelled"}},
+            projection={"_id": 0, "id": 1, "date": 1, "game_type": 1, "time_slot": 1,
+                        "duration": 1, "start_minute": 1, "station": 1}
+        )
+
+        by_day: Dict[Tuple[date, str], List[dict]] = {}
+        async for doc in cursor:
+            if booking_slot_span(doc) is None:
+                logger.warning(f"Skipping booking with invalid time slot: {doc.get('time_slot')}")
+                continue
+            by_day.setdefault((as_date(doc["date"]), doc["game_type"]), []).append(doc)
+
+        claims: List[dict] = []
+        operations: List[UpdateOne] = []
+        unassigned = 0
+        for (day, game_type), docs in by_day.items():
+            schedule = StationSchedule(RESOURCE_CAPACITY.get(game_type, 1))
+            docs.sort(key=lambda doc: booking_slot_span(doc))
+            for doc in docs:
+                span = booking_slot_span(doc)
+                station = doc.get("station")
+                if not (isinstance(station, int) and 1 <= station <= schedule.num_stations
+                        and schedule.is_free(station, *span)):
+                    station = schedule.best_fit(*span)
+                if station is None:
+                    unassigned += 1
+                    logger.warning(f"No free {game_type} station for booking {doc['id']} on {day.isoformat()}")
+                else:
+                    schedule.add(station, *span)
+                    claims.extend(self._claim_docs(day, game_type, station, span, doc["id"]))
+                if station != doc.get("station"):
+                    operations.append(UpdateOne({"id": doc["id"]}, {"$set": {"station": station}}))
+
+        if operations:
+            await bookings_collection.bulk_write(operations, ordered=False)
+        await self.collection.delete_many({"date": {"$gte": start}})
+        if claims:
+            await self.collection.insert_many(claims)
+        logger.info(f"Rebuilt {len(claims)} station claims from {from_date.isoformat()}; "
+                    f"{len(operations)} bookings reassigned, {unassigned} without a station")
+        return len(claims)
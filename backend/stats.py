@@ -0,0 +1,170 @@
+"""Daily booking rollups.
+
+`daily_stats` holds one document per (date, game_type) with its booking
+counts, slot-hours and revenue. BookingService applies every booking
+transition (create, cancel, reactivate, delete) as `$inc` deltas, so
+reports read O(days) small documents instead of scanning bookings.
+Utilization is derived on read from slot-hours and RESOURCE_CAPACITY.
+
+If the rollups drift (or for a first backfill), rebuild them with
+`python migrations.py rebuild-stats`.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from pymongo import UpdateOne
+
+from cache import as_date
+from config import END_TIME, RESOURCE_CAPACITY, SLOT_INTERVAL, START_TIME
+from slots import slot_index, slot_range
+
+logger = logging.getLogger(__name__)
+
+OPEN_HOURS = END_TIME - START_TIME
+
+COUNTER_FIELDS = ("active_bookings", "cancelled_bookings", "slot_hours", "revenue")
+
+
+def booking_slot_hours(time_slot: str, duration: int) -> float:
+    """Hours of slot time a booking occupies, truncated at closing time"""
+    try:
+        return len(slot_range(slot_index(time_slot), duration)) * SLOT_INTERVAL / 60
+    except ValueError:
+        return 0.0
+
+
+def booking_deltas(booking_doc: dict, old_status: Optional[str], new_status: Optional[str]) -> Dict[str, float]:
+    """$inc amounts for a booking moving from old_status to new_status.
+
+    None stands for "does not exist", so (None, "pending") is a create and
+    ("confirmed", None) a delete. Only the active/cancelled distinction
+    matters here; moves between active statuses change nothing.
+    """
+    deltas = {field: 0 for field in COUNTER_FIELDS}
+    for status, sign in ((old_status, -1), (new_status, 1)):
+        if status is None:
+            continue
+        if status == "cancelled":
+            deltas["cancelled_bookings"] += sign
+        else:
+            deltas["active_bookings"] += sign
+            deltas["slot_hours"] += sign * booking_slot_hours(booking_doc["time_slot"], booking_doc.get("duration", 60))
+            deltas["revenue"] += sign * booking_doc.get("price", 0.0)
+    return {field: value for field, value in deltas.items() if value}
+
+
+def with_utilization(doc: dict) -> dict:
+    """Public form of a stats document: plain date, rounded revenue and utilization"""
+    capacity = RESOURCE_CAPACITY.get(doc["game_type"], 1)
+    slot_hours = doc.get("slot_hours", 0)
+    return {
+        "date": as_date(doc["date"]).isoformat(),
+        "game_type": doc["game_type"],
+        "active_bookings": doc.get("active_bookings", 0),
+        "cancelled_bookings": doc.get("cancelled_bookings", 0),
+        "slot_hours": slot_hours,
+        "revenue": round(doc.get("revenue", 0), 2),
+        "utilization": round(slot_hours / (capacity * OPEN_HOURS), 4),
+    }
+
+
+class DailyStats:
+    def __init__(self, db):
+        self.collection = db.daily_stats
+
+    @staticmethod
+    def _stats_id(day: date, game_type: str) -> str:
+        return f"{day.isoformat()}|{game_type}"
+
+    async def record(self, transitions: Iterable[Tuple[dict, Optional[str], Optional[str]]]):
+        """Apply (booking_doc, old_status, new_status) transitions in one bulk write"""
+        totals: Dict[Tuple[date, str], Dict[str, float]] = {}
+        for booking_doc, old_status, new_status in transitions:
+            key = (as_date(booking_doc["date"]), booking_doc["game_type"])
+            entry = totals.setdefault(key, {})
+            for field, value in booking_deltas(booking_doc, old_status, new_status).items():
+                entry[field] = entry.get(field, 0) + value
+
+        operations = [
+            UpdateOne(
+                {"_id": self._stats_id(day, game_type)},
+                {
+                    "$inc": deltas,
+                    "$setOnInsert": {"date": datetime.combine(day, datetime.min.time()), "game_type": game_type},
+                },
+                upsert=True
+            )
+            for (day, game_type), deltas in totals.items() if deltas
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def daily(self, from_date: date, to_date: date, game_type: Optional[str] = None) -> List[dict]:
+        """Per-day, per-game-type stats for from_date through to_date"""
+        query: Dict[str, Any] = {
+            "date": {
+                "$gte": datetime.combine(from_date, datetime.min.time()),
+                "$lt": datetime.combine(to_date, datetime.min.time()) + timedelta(days=1)
+            }
+        }
+        if game_type:
+            query["game_type"] = game_type
+        cursor = self.collection.find(query, projection={"_id": 0}).sort([("date", 1), ("game_type", 1)])
+        # Deleting a day's last booking leaves its document at zero; report it like a rebuild would
+        return [with_utilization(doc) async for doc in cursor
+                if doc.get("active_bookings") or doc.get("cancelled_bookings")]
+
+    async def summary(self, from_date: date, to_date: date) -> Dict[str, Any]:
+        """Totals per game type and overall for from_date through to_date"""
+        days = (to_date - from_date).days + 1
+        per_game: Dict[str, Dict[str, float]] = {}
+        for row in await self.daily(from_date, to_date):
+            entry = per_game.setdefault(row["game_type"], {field: 0 for field in COUNTER_FIELDS})
+            for field in COUNTER_FIELDS:
+                entry[field] += row[field]
+
+        game_types = {}
+        for game_type, entry in sorted(per_game.items()):
+            capacity = RESOURCE_CAPACITY.get(game_type, 1)
+            game_types[game_type] = {
+                **entry,
+                "revenue": round(entry["revenue"], 2),
+                "utilization": round(entry["slot_hours"] / (capacity * OPEN_HOURS * days), 4),
+            }
+        return {
+            "from": from_date.isoformat(),
+            "to": to_date.isoformat(),
+            "active_bookings": sum(entry["active_bookings"] for entry in per_game.values()),
+            "cancelled_bookings": sum(entry["cancelled_bookings"] for entry in per_game.values()),
+            "revenue": round(sum(entry["revenue"] for entry in per_game.values()), 2),
+            "game_types": game_types,
+        }
+
+    async def rebuild(self, bookings_collection, from_date: date) -> int:
+        """Recompute stats for every date from `from_date` on from the bookings themselves"""
+        start = datetime.combine(from_date, datetime.min.time())
+        cursor = bookings_collection.find(
+            {"date": {"$gte": start}},
+            projection={"_id": 0, "date": 1, "game_type": 1, "time_slot": 1,
+                        "duration": 1, "status": 1, "price": 1}
+        )
+
+        totals: Dict[str, Dict] = {}
+        async for doc in cursor:
+            day = as_date(doc["date"])
+            entry = totals.setdefault(self._stats_id(day, doc["game_type"]), {
+                "date": datetime.combine(day, datetime.min.time()),
+                "game_type": doc["game_type"],
+                **{field: 0 for field in COUNTER_FIELDS},
+            })
+            for field, value in booking_deltas(doc, None, doc.get("status", "pending")).items():
+                entry[field] += value
+
+        await self.collection.delete_many({"date": {"$gte": start}})
+        if totals:
+            await self.collection.insert_many(
+                [{"_id": stats_id, **entry} for stats_id, entry in totals.items()]
+            )
+        logger.info(f"Rebuilt {len(totals)} daily stats documents from {from_date.isoformat()}")
+        return len(totals)
@@ -0,0 +1,49 @@
+"""Availability version numbers for HTTP validators.
+
+Every booking write bumps a counter for its (date, game_type) in
+`availability_versions`, one document per date. All workers share it, so
+GET /api/availability/{date} can build its ETag from one `_id` lookup.
+A request whose If-None-Match still matches is answered without loading
+any bookings. Each bump also stamps `updated_at`, which the cache coherence
+poller follows.
+"""
+from datetime import datetime
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from cache import as_date
+from config import RESOURCE_CAPACITY
+
+
+class AvailabilityVersions:
+    def __init__(self, db):
+        self.collection = db.availability_versions
+
+    async def get(self, booking_date, game_type: str) -> int:
+        if game_type not in RESOURCE_CAPACITY:
+            # Nothing can be booked for unknown game types, so their availability never changes
+            return 0
+        doc = await self.collection.find_one(
+            {"_id": as_date(booking_date).isoformat()}, projection={f"versions.{game_type}": 1}
+        )
+        return ((doc or {}).get("versions") or {}).get(game_type, 0)
+
+    async def bump(self, booking_date, game_type: str) -> Optional[int]:
+        day = as_date(booking_date)
+        doc = await self.collection.find_one_and_update(
+            {"_id": day.isoformat()},
+            {
+                "$inc": {f"versions.{game_type}": 1},
+                "$set": {"updated_at": datetime.utcnow()},
+                "$setOnInsert": {"date": datetime.combine(day, datetime.min.time())},
+            },
+            projection={f"versions.{game_type}": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["versions"][game_type] if doc else None
+
+    def on_booking_write(self, booking_date, game_type: str):
+        """Booking write listener"""
+        return self.bump(booking_date, game_type)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Button } from '../components/ui/button';
 import { ArrowLeft, Phone, MapPin, Calendar, Clock, User, Mail, Gamepad2, LogOut, CheckCircle, XCircle, AlertCircle, Hash } from 'lucide-react';
@@ -9,7 +9,12 @@ import { bookingService } from '../services/api';
 const AdminPage = () => {
   const navigate = useNavigate();
   const [bookings, setBookings] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [counts, setCounts] = useState({ total: 0, by_status: {} });
   const [loading, setLoading] = useState(true);
+  // Pages fetched beyond the first with "Load more"; auto-refresh keeps them
+  const extraPages = useRef(0);
   const [error, setError] = useState(null);
   const [isLoggedIn, setIsLoggedIn] = useState(false);
 
@@ -38,7 +43,7 @@ const AdminPage = () => {
     if (loggedIn) {
       fetchBookings();
       // Auto-refresh every 30 seconds
-      const interval = setInterval(fetchBookings, 30000);
+      const interval = setInterval(refreshBookings, 30000);
       return () => clearInterval(interval);
     }
   }, [isLoggedIn]);
@@ -54,24 +59,68 @@ const AdminPage = () => {
     sessionStorage.removeItem('kgg_admin_logged_in');
     setIsLoggedIn(false);
     setBookings([]);
+    setNextCursor(null);
+  };
+
+  const fetchCounts = async () => {
+    try {
+      setCounts(await bookingService.getCounts());
+    } catch (err) {
+      console.error('Error fetching booking counts:', err);
+    }
   };
 
   const fetchBookings = async () => {
     try {
       setLoading(true);
-      const data = await bookingService.getAll();
-      setBookings(data.sort((a, b) => new Date(b.created_at) - new Date(a.created_at)));
+      // The list is paged (newest first); the totals come from the server
+      const [page] = await Promise.all([bookingService.getPage(), fetchCounts()]);
+      setBookings(page.bookings);
+      setNextCursor(page.nextCursor);
+      extraPages.current = 0;
       setError(null);
       console.log('Successfully fetched bookings');
     } catch (err) {
       console.error('Error fetching bookings:', err);
       setError(`Failed to load bookings: ${err.message}`);
       setBookings([]);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
   };
 
+  // Pick up new bookings on top without dropping the older pages already loaded
+  const refreshBookings = async () => {
+    if (extraPages.current === 0) {
+      fetchBookings();
+      return;
+    }
+    try {
+      const [page] = await Promise.all([bookingService.getPage(), fetchCounts()]);
+      const freshIds = new Set(page.bookings.map(booking => booking.id));
+      setBookings(prevBookings => [...page.bookings, ...prevBookings.filter(booking => !freshIds.has(booking.id))]);
+    } catch (err) {
+      console.error('Error refreshing bookings:', err);
+    }
+  };
+
+  const loadMoreBookings = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await bookingService.getPage({ cursor: nextCursor });
+      setBookings(prevBookings => [...prevBookings, ...page.bookings]);
+      setNextCursor(page.nextCursor);
+      extraPages.current += 1;
+    } catch (err) {
+      console.error('Error fetching more bookings:', err);
+      alert('Failed to load more bookings. Please try again.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const updateBookingStatus = async (bookingId, newStatus) => {
     try {
       const updatedBooking = await bookingService.update(bookingId, { status: newStatus });
@@ -82,6 +131,7 @@ const AdminPage = () => {
           booking.id === bookingId ? updatedBooking : booking
         )
       );
+      fetchCounts();
       
       console.log('Successfully updated booking status');
     } catch (err) {
@@ -173,13 +223,13 @@ const AdminPage = () => {
         )}
 
         {/* Statistics Cards */}
-        <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-5 gap-6 mb-8">
+        <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6 mb-8">
           <Card className="bg-gaming-card border-gaming-border shadow-gaming">
             <CardContent className="p-6">
               <div className="flex items-center">
                 <Calendar className="w-8 h-8 text-gaming-accent mr-3" />
                 <div>
-                  <div className="text-2xl font-bold text-gaming-text">{bookings.length}</div>
+                  <div className="text-2xl font-bold text-gaming-text">{counts.total}</div>
                   <div className="text-gaming-text-secondary">Total Bookings</div>
                 </div>
               </div>
@@ -192,7 +242,7 @@ const AdminPage = () => {
                 <AlertCircle className="w-8 h-8 text-yellow-500 mr-3" />
                 <div>
                   <div className="text-2xl font-bold text-gaming-text">
-                    {bookings.filter(b => b.status === 'pending').length}
+                    {counts.by_status.pending || 0}
                   </div>
                   <div className="text-gaming-text-secondary">Pending</div>
                 </div>
@@ -206,7 +256,7 @@ const AdminPage = () => {
                 <CheckCircle className="w-8 h-8 text-green-500 mr-3" />
                 <div>
                   <div className="text-2xl font-bold text-gaming-text">
-                    {bookings.filter(b => b.status === 'confirmed').length}
+                    {counts.by_status.confirmed || 0}
                   </div>
                   <div className="text-gaming-text-secondary">Confirmed</div>
                 </div>
@@ -220,27 +270,13 @@ const AdminPage = () => {
                 <XCircle className="w-8 h-8 text-red-500 mr-3" />
                 <div>
                   <div className="text-2xl font-bold text-gaming-text">
-                    {bookings.filter(b => b.status === 'cancelled').length}
+                    {counts.by_status.cancelled || 0}
                   </div>
                   <div className="text-gaming-text-secondary">Cancelled</div>
                 </div>
               </div>
             </CardContent>
           </Card>
-
-          <Card className="bg-gaming-card border-gaming-border shadow-gaming">
-            <CardContent className="p-6">
-              <div className="flex items-center">
-                <User className="w-8 h-8 text-purple-500 mr-3" />
-                <div>
-                  <div className="text-2xl font-bold text-gaming-text">
-                    {new Set(bookings.map(b => b.phone)).size}
-                  </div>
-                  <div className="text-gaming-text-secondary">Unique Customers</div>
-                </div>
-              </div>
-            </CardContent>
-          </Card>
         </div>
 
         {/* Bookings List */}
@@ -379,6 +415,18 @@ const AdminPage = () => {
                 </CardContent>
               </Card>
             ))}
+
+            {nextCursor && (
+              <div className="text-center">
+                <Button
+                  onClick={loadMoreBookings}
+                  disabled={loadingMore}
+                  className="bg-gaming-accent hover:bg-gaming-accent-hover text-gaming-light"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more bookings'}
+                </Button>
+              </div>
+            )}
           </div>
         )}
       </div>
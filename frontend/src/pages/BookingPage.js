@@ -10,7 +10,7 @@ import { ArrowLeft, Calendar as CalendarIcon, Clock, GamepadIcon, Phone, MapPin
 import { format } from 'date-fns';
 import { useNavigate } from 'react-router-dom';
 import { useToast } from '../hooks/use-toast';
-import { bookingService, availabilityService, settingsService } from '../services/api';
+import { bookingService, availabilityService, pricingService, settingsService } from '../services/api';
 import { createBooking } from '../services/api';
 import ReferenceNumberModal from '../components/ReferenceNumberModal';
 import { useApi, useApiMutation } from '../hooks/useApi';
@@ -24,6 +24,7 @@ const BookingPage = () => {
   const [duration, setDuration] = useState(60); // Duration in minutes
   const [numPeople, setNumPeople] = useState(1); // Number of people
   const [calculatedPrice, setCalculatedPrice] = useState(null); // Calculated price
+  const [priceQuotes, setPriceQuotes] = useState(null); // Quote matrix for every game type, duration and party size
   const [formData, setFormData] = useState({
     name: '',
     phone: '',
@@ -112,10 +113,22 @@ const BookingPage = () => {
     loadAvailability();
   }, [selectedDate, toast]);
 
+  // Load all prices once; the form then prices locally instead of calling the API on every change
+  useEffect(() => {
+    pricingService.getQuotes()
+      .then(setPriceQuotes)
+      .catch((error) => console.error('Error loading price quotes:', error));
+  }, []);
+
   // Calculate price when game type, duration, or number of people changes
   useEffect(() => {
     const calculatePrice = async () => {
       if (formData.game_type && duration && numPeople) {
+        const quote = pricingService.quoteFromMatrix(priceQuotes, formData.game_type, duration, numPeople);
+        if (quote) {
+          setCalculatedPrice(quote);
+          return;
+        }
         try {
           const priceData = await bookingService.calculatePrice({
             game_type: formData.game_type,
@@ -133,7 +146,7 @@ const BookingPage = () => {
     };
 
     calculatePrice();
-  }, [formData.game_type, duration, numPeople]);
+  }, [formData.game_type, duration, numPeople, priceQuotes]);
 
   const handleInputChange = (name, value) => {
     setFormData(prev => ({
@@ -29,7 +29,7 @@ class ApiService {
   }
 
   async makeRequest(endpoint, options = {}) {
-    const { method = 'GET', body, headers = {}, timeout = 15000 } = options;
+    const { method = 'GET', body, headers = {}, timeout = 15000, withHeaders = false } = options;
 
     try {
       const controller = new AbortController();
@@ -92,7 +92,7 @@ class ApiService {
         data = null;
       }
       console.log(`✅ API Success: ${method} ${url}`, { status: response.status });
-      return data;
+      return withHeaders ? { data, headers: response.headers } : data;
     } catch (error) {
       // Distinguish timeout/abort from other errors
       if (error && error.name === 'AbortError') {
@@ -121,8 +121,21 @@ export const bookingService = {
     });
   },
 
-  getAll: async () => {
-    return await apiService.makeRequest('/bookings');
+  // One page of bookings, newest first; pass nextCursor back to get the next page
+  getPage: async ({ cursor, limit } = {}) => {
+    const params = new URLSearchParams();
+    if (cursor) params.set('cursor', cursor);
+    if (limit) params.set('limit', String(limit));
+    const query = params.toString();
+    const { data, headers } = await apiService.makeRequest(`/bookings${query ? `?${query}` : ''}`, {
+      withHeaders: true,
+    });
+    return { bookings: data || [], nextCursor: headers.get('X-Next-Cursor') };
+  },
+
+  // Totals over all bookings: { total, by_status }
+  getCounts: async () => {
+    return await apiService.makeRequest('/bookings/counts');
   },
 
   getById: async (id) => {
@@ -160,18 +173,90 @@ export const bookingService = {
   },
 };
 
+// Pricing service
+export const pricingService = {
+  // Every game type x duration x party size price in one cacheable response
+  getQuotes: async () => {
+    return await apiService.makeRequest('/pricing/quotes');
+  },
+
+  // Same shape as bookingService.calculatePrice, or null if the matrix does not cover it
+  quoteFromMatrix: (matrix, gameType, duration, numPeople) => {
+    const entry = matrix?.game_types?.[gameType];
+    const totalPrice = entry?.prices?.[String(duration)]?.[numPeople - 1];
+    if (totalPrice === undefined) {
+      return null;
+    }
+    const rate = entry.rate_per_hour;
+    const hours = duration / 60;
+    return {
+      game_type: gameType,
+      duration,
+      num_people: numPeople,
+      rate_per_hour: rate,
+      total_price: totalPrice,
+      breakdown: {
+        rate: `₹${rate}/hour/person`,
+        hours,
+        people: numPeople,
+        calculation: `₹${rate} × ${hours} hours × ${numPeople} people`,
+      },
+    };
+  },
+};
+
+// Format as local YYYY-MM-DD to avoid timezone shifting from toISOString()
+const toDateString = (date) => {
+  if (!(date instanceof Date)) {
+    return date;
+  }
+  const y = date.getFullYear();
+  const m = String(date.getMonth() + 1).padStart(2, '0');
+  const d = String(date.getDate()).padStart(2, '0');
+  return `${y}-${m}-${d}`;
+};
+
 // Availability service
 export const availabilityService = {
   getByDate: async (date) => {
-    let dateStr = date;
-    if (date instanceof Date) {
-      // Format as local YYYY-MM-DD to avoid timezone shifting from toISOString()
-      const y = date.getFullYear();
-      const m = String(date.getMonth() + 1).padStart(2, '0');
-      const d = String(date.getDate()).padStart(2, '0');
-      dateStr = `${y}-${m}-${d}`;
+    return await apiService.makeRequest(`/availability/${toDateString(date)}`);
+  },
+
+  // Streams one availability object per day; onDay is called as each day arrives
+  getRange: async (from, to, { gameType, duration = 60 } = {}, onDay = () => {}) => {
+    const params = new URLSearchParams({ from: toDateString(from), to: toDateString(to), duration: String(duration) });
+    if (gameType) {
+      params.set('game_type', gameType);
+    }
+    const url = apiService.baseUrl
+      ? `${apiService.baseUrl}/api/availability?${params}`
+      : `/api/availability?${params}`;
+
+    const response = await fetch(url);
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const days = [];
+    let buffer = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+      const lines = buffer.split('\n');
+      buffer = done ? '' : lines.pop();
+      for (const line of lines) {
+        if (line.trim()) {
+          const day = JSON.parse(line);
+          days.push(day);
+          onDay(day);
+        }
+      }
+      if (done) {
+        return days;
+      }
     }
-    return await apiService.makeRequest(`/availability/${dateStr}`);
   },
 };
 
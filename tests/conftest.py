@@ -0,0 +1,36 @@
+"""Shared fixtures for the backend tests.
+
+The backend modules import each other as top-level modules, so the backend
+directory goes on sys.path. MongoDB is replaced by mongomock_motor.
+"""
+import sys
+from pathlib import Path
+
+import mongomock.collection
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import ReturnDocument
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+_find_and_modify = mongomock.collection.Collection._find_and_modify
+
+
+def _find_and_modify_by_id(self, query, projection=None, update=None, upsert=False, sort=None,
+                           return_document=ReturnDocument.BEFORE, session=None, **kwargs):
+    # mongomock looks the document up again with the original filter to return
+    # it AFTER the update, which misses once the update changed a filtered
+    # field and _id is projected out; mongod returns the updated document
+    if return_document is ReturnDocument.AFTER and not kwargs.get("remove"):
+        matched = self.find_one(query, projection={"_id": 1}, sort=sort)
+        if matched:
+            query = {"_id": matched["_id"]}
+    return _find_and_modify(self, query, projection, update, upsert, sort, return_document, session, **kwargs)
+
+
+mongomock.collection.Collection._find_and_modify = _find_and_modify_by_id
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["kgg_test"]
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from capacity import CapacityError
+from services import AvailabilityService, BookingService
+
+DAY = "2031-01-06"
+
+
+def booking(game_type="xbox", time_slot="10:00 AM", duration=60, **fields):
+    return dict(name="Test", phone="9999999999", game_type=game_type, time_slot=time_slot,
+                duration=duration, date=DAY, **fields)
+
+
+def test_full_slot_rejects_the_next_booking(db):
+    async def scenario():
+        service = BookingService(db)
+        await service.create_booking(booking())
+        with pytest.raises(CapacityError):
+            await service.create_booking(booking(time_slot="10:30 AM"))
+        return await db.bookings.count_documents({})
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_cancel_releases_and_reactivate_reserves_again(db):
+    async def scenario():
+        service = BookingService(db)
+        first = await service.create_booking(booking())
+        await service.update_booking(first.id, {"status": "cancelled"})
+        second = await service.create_booking(booking())
+
+        # The slot is taken again, so the cancelled booking cannot come back
+        with pytest.raises(CapacityError):
+            await service.update_booking(first.id, {"status": "confirmed"})
+        assert (await service.get_booking_by_id(first.id)).status == "cancelled"
+
+        await service.update_booking(second.id, {"status": "cancelled"})
+        reactivated = await service.update_booking(first.id, {"status": "confirmed"})
+        assert reactivated.status == "confirmed"
+        with pytest.raises(CapacityError):
+            await service.create_booking(booking())
+
+    asyncio.run(scenario())
+
+
+def test_cancel_by_reference_releases_capacity(db):
+    async def scenario():
+        service = BookingService(db)
+        first = await service.create_booking(booking())
+        await service.cancel_booking_by_reference(first.reference_number)
+        await service.create_booking(booking())
+
+    asyncio.run(scenario())
+
+
+def test_group_over_capacity_is_all_or_nothing(db):
+    async def scenario():
+        service = BookingService(db)
+        with pytest.raises(CapacityError):
+            await service.create_booking_group([booking(game_type="meta_quest_vr") for _ in range(3)])
+
+        # 10:00 has room for both headsets, 10:30 only for one
+        await service.create_booking(booking(game_type="meta_quest_vr", time_slot="10:30 AM", duration=30))
+        with pytest.raises(CapacityError):
+            await service.create_booking_group([booking(game_type="meta_quest_vr") for _ in range(2)])
+        assert await db.bookings.count_documents({}) == 1
+
+        # The failed groups held nothing back at 10:00
+        _, bookings = await service.create_booking_group(
+            [booking(game_type="meta_quest_vr", duration=30) for _ in range(2)]
+        )
+        return bookings
+
+    assert len(asyncio.run(scenario())) == 2
+
+
+def test_bookings_without_minute_offsets_still_fill_their_slot(db):
+    async def scenario():
+        service = BookingService(db)
+        # Made before start_minute/end_minute existed and not yet backfilled
+        await db.bookings.insert_one({
+            "id": "legacy", "date": datetime(2031, 1, 6), "game_type": "xbox",
+            "time_slot": "11:00 AM", "duration": 60, "status": "confirmed",
+        })
+        availability = AvailabilityService(service)
+        day = datetime(2031, 1, 6)
+        return (await availability.check_capacity_for_slot(day, "11:30 AM", "xbox", 60),
+                await availability.check_capacity_for_slot(day, "12:00 PM", "xbox", 60))
+
+    during, after = asyncio.run(scenario())
+    assert during == {"available": False, "booked": 1, "capacity": 1}
+    assert after["available"] is True
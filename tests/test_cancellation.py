@@ -0,0 +1,32 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import services
+from services import BookingService
+
+
+def booking(time_slot):
+    return dict(name="Test", phone="9999999999", game_type="board_games", time_slot=time_slot,
+                duration=60, date="2031-01-06")
+
+
+def test_cancellation_deadline_uses_venue_time(db, monkeypatch):
+    # 9:30 AM at the venue, whatever the server clock says
+    monkeypatch.setattr(services, "venue_now", lambda: datetime(2031, 1, 6, 9, 30))
+
+    async def scenario():
+        service = BookingService(db)
+        soon = await service.create_booking(booking("10:30 AM"))
+        later = await service.create_booking(booking("11:00 AM"))
+
+        with pytest.raises(ValueError, match="at least 1 hour"):
+            await service.cancel_booking_by_reference(soon.reference_number)
+        cancelled = await service.cancel_booking_by_reference(later.reference_number)
+        assert cancelled.status == "cancelled"
+        with pytest.raises(ValueError, match="already cancelled"):
+            await service.cancel_booking_by_reference(later.reference_number)
+        assert await service.cancel_booking_by_reference("KGG-missing") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import date
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from capacity import CapacityError, SlotCounters
+
+DAY = date(2031, 1, 6)
+
+
+async def counts(counters):
+    return {(doc["game_type"], doc["slot_minute"]): doc["count"] async for doc in counters.collection.find({})}
+
+
+def test_reserve_takes_one_unit_per_slot(db):
+    async def scenario():
+        counters = SlotCounters(db)
+        await counters.reserve(DAY, "playstation", [600, 630])
+        await counters.reserve(DAY, "playstation", [630, 660])
+        return await counts(counters)
+
+    assert asyncio.run(scenario()) == {("playstation", 600): 1, ("playstation", 630): 2, ("playstation", 660): 1}
+
+
+def test_full_slot_rolls_back_the_whole_reservation(db):
+    async def scenario():
+        counters = SlotCounters(db)
+        await counters.reserve(DAY, "xbox", [660])
+        with pytest.raises(CapacityError, match="xbox is fully booked at 11:00"):
+            await counters.reserve(DAY, "xbox", [600, 630, 660])
+        return await counts(counters)
+
+    assert asyncio.run(scenario()) == {("xbox", 600): 0, ("xbox", 630): 0, ("xbox", 660): 1}
+
+
+def test_release_gives_capacity_back(db):
+    async def scenario():
+        counters = SlotCounters(db)
+        await counters.reserve(DAY, "xbox", [600])
+        await counters.release(DAY, "xbox", [600])
+        await counters.reserve(DAY, "xbox", [600])
+        with pytest.raises(CapacityError):
+            await counters.reserve(DAY, "xbox", [600])
+        return await counts(counters)
+
+    assert asyncio.run(scenario()) == {("xbox", 600): 1}
+
+
+def test_reserve_many_checks_combined_demand(db):
+    async def scenario():
+        counters = SlotCounters(db)
+        with pytest.raises(CapacityError):
+            await counters.reserve_many({(DAY, "meta_quest_vr", 600): 3})
+        await counters.reserve_many({(DAY, "meta_quest_vr", 600): 2, (DAY, "xbox", 600): 1})
+        return await counts(counters)
+
+    assert asyncio.run(scenario()) == {("meta_quest_vr", 600): 2, ("xbox", 600): 1}
+
+
+def test_counter_creation_race_is_retried(db):
+    async def scenario():
+        counters = SlotCounters(db)
+        bulk_write = counters.collection.bulk_write
+        raced = []
+
+        async def racing_bulk_write(operations, ordered=True):
+            if not raced:
+                # Another request creates the counter between our check and insert
+                raced.append(True)
+                await counters.collection.insert_one({
+                    "_id": f"{DAY.isoformat()}|playstation|600", "game_type": "playstation", "slot_minute": 600, "count": 1
+                })
+                raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000"}]})
+            return await bulk_write(operations, ordered=ordered)
+
+        counters.collection.bulk_write = racing_bulk_write
+        await counters.reserve(DAY, "playstation", [600, 630])
+        return await counts(counters)
+
+    assert asyncio.run(scenario()) == {("playstation", 600): 2, ("playstation", 630): 1}
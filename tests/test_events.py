@@ -0,0 +1,75 @@
+import asyncio
+import json
+from datetime import date
+
+from events import AvailabilityBroadcaster
+from services import AvailabilityService, BookingService
+from versions import AvailabilityVersions
+
+DAY = date(2031, 1, 6)
+
+
+def setup(db):
+    booking_service = BookingService(db)
+    versions = AvailabilityVersions(db)
+    booking_service.add_write_listener(versions.on_booking_write)
+    broadcaster = AvailabilityBroadcaster(AvailabilityService(booking_service), versions)
+    booking_service.add_write_listener(broadcaster.on_booking_write)
+    return booking_service, versions, broadcaster
+
+
+def drain(subscription):
+    messages = []
+    while not subscription.queue.empty():
+        message = subscription.queue.get_nowait()
+        event = message.split("event: ")[1].split("\n")[0]
+        messages.append((event, json.loads(message.split("data: ")[1])))
+    return messages
+
+
+def test_new_date_subscription_does_not_notify_others(db):
+    async def scenario():
+        _, _, broadcaster = setup(db)
+        watcher = await broadcaster.subscribe()
+        await broadcaster.subscribe(DAY, "xbox")
+        await broadcaster.subscribe(DAY)
+        return drain(watcher)
+
+    assert [event for event, _ in asyncio.run(scenario())] == ["ready"]
+
+
+def test_write_sends_changed_slots_with_shared_version(db):
+    async def scenario():
+        booking_service, versions, broadcaster = setup(db)
+        subscription = await broadcaster.subscribe(DAY, "xbox")
+        (_, snapshot), = drain(subscription)
+
+        await booking_service.create_booking(dict(
+            name="Test", phone="9999999999", game_type="xbox", time_slot="10:30 AM", duration=60, date=DAY
+        ))
+        await asyncio.gather(*broadcaster._tasks)
+        return snapshot, drain(subscription), await versions.get(DAY, "xbox")
+
+    snapshot, messages, version = asyncio.run(scenario())
+    assert snapshot["version"] == 0
+    (event, delta), = messages
+    assert event == "delta"
+    assert delta["version"] == version == 1
+    assert [slot["time"] for slot in delta["time_slots"]] == ["10:30 AM", "11:00 AM"]
+
+
+def test_unchanged_occupancy_sends_nothing(db):
+    async def scenario():
+        booking_service, _, broadcaster = setup(db)
+        booking = await booking_service.create_booking(dict(
+            name="Test", phone="9999999999", game_type="xbox", time_slot="10:30 AM", duration=60, date=DAY
+        ))
+        subscription = await broadcaster.subscribe(DAY, "xbox")
+        drain(subscription)
+
+        await booking_service.update_booking(booking.id, {"special_requests": "window seat"})
+        broadcaster.invalidate_date(DAY)
+        await asyncio.gather(*broadcaster._tasks)
+        return drain(subscription)
+
+    assert asyncio.run(scenario()) == []
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from idempotency import IdempotencyKeyReused, IdempotencyStore
+
+
+def test_replay_is_one_lookup(db):
+    async def scenario():
+        store = IdempotencyStore(db)
+        assert await store.begin("key-1", "fingerprint") is None
+        await store.complete("key-1", 200, {"id": "booking-1"})
+
+        inserts = []
+        insert_one = store.collection.insert_one
+
+        async def counting_insert_one(document):
+            inserts.append(document)
+            return await insert_one(document)
+
+        store.collection.insert_one = counting_insert_one
+        stored = await store.begin("key-1", "fingerprint")
+        return stored, inserts
+
+    stored, inserts = asyncio.run(scenario())
+    assert stored == {"status_code": 200, "body": {"id": "booking-1"}}
+    assert inserts == []
+
+
+def test_key_reused_with_another_body_is_rejected(db):
+    async def scenario():
+        store = IdempotencyStore(db)
+        await store.begin("key-1", "fingerprint")
+        await store.complete("key-1", 200, {})
+        with pytest.raises(IdempotencyKeyReused):
+            await store.begin("key-1", "other fingerprint")
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_key_can_be_claimed_again(db):
+    async def scenario():
+        store = IdempotencyStore(db)
+        await store.begin("key-1", "fingerprint")
+        await store.abandon("key-1")
+        return await store.begin("key-1", "fingerprint")
+
+    assert asyncio.run(scenario()) is None
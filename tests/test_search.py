@@ -0,0 +1,88 @@
+import asyncio
+from datetime import date, datetime
+
+import pytest
+
+from services import AvailabilityService, BookingService
+
+DAY = date(2031, 1, 6)
+NEXT_DAY = date(2031, 1, 7)
+
+
+def booking(game_type="xbox", time_slot="10:00 AM", duration=60, day=DAY):
+    return dict(name="Test", phone="9999999999", game_type=game_type, time_slot=time_slot,
+                duration=duration, date=day.isoformat())
+
+
+def search(db, bookings, start, duration=60, game_types=("xbox",), **options):
+    async def scenario():
+        service = BookingService(db)
+        for item in bookings:
+            await service.create_booking(item)
+        return await AvailabilityService(service).find_earliest_slots(start, duration, list(game_types), **options)
+
+    return [(option["date"], option["time"], option["game_type"], option["available_units"])
+            for option in asyncio.run(scenario())]
+
+
+def test_options_start_at_the_search_start_and_interleave_game_types(db):
+    options = search(db, [booking(time_slot="11:30 AM")], datetime(2031, 1, 6, 11, 15),
+                     game_types=("xbox", "nintendo"), horizon_days=1, limit=4)
+
+    # Nothing before 11:15; the xbox is busy 11:30-12:30, and at equal times
+    # game types keep the requested order
+    assert options == [
+        ("2031-01-06", "11:30 AM", "nintendo", 1),
+        ("2031-01-06", "12:00 PM", "nintendo", 1),
+        ("2031-01-06", "12:30 PM", "xbox", 1),
+        ("2031-01-06", "12:30 PM", "nintendo", 1),
+    ]
+
+
+def test_sessions_must_end_by_closing_time(db):
+    options = search(db, [], datetime(2031, 1, 6, 18, 15), duration=120, horizon_days=2, limit=3)
+
+    # The last two-hour session starts at 7:00 PM; the search carries on the next morning
+    assert options == [
+        ("2031-01-06", "6:30 PM", "xbox", 1),
+        ("2031-01-06", "7:00 PM", "xbox", 1),
+        ("2031-01-07", "10:00 AM", "xbox", 1),
+    ]
+
+
+def test_available_units_count_stations_free_for_the_whole_session(db):
+    async def scenario():
+        service = BookingService(db)
+        # Headset 1 busy 10:00-11:00, headset 2 busy 11:00-12:00
+        await service.create_booking(booking(game_type="meta_quest_vr"))
+        filler = await service.create_booking(booking(game_type="meta_quest_vr", time_slot="11:00 AM", duration=30))
+        await service.create_booking(booking(game_type="meta_quest_vr", time_slot="11:00 AM"))
+        await service.update_booking(filler.id, {"status": "cancelled"})
+        return await AvailabilityService(service).find_earliest_slots(
+            datetime(2031, 1, 6, 10, 0), 60, ["meta_quest_vr"], horizon_days=1, limit=3
+        )
+
+    # At 10:30 one headset is free in every slot, but not the same one throughout
+    assert [(option["time"], option["available_units"]) for option in asyncio.run(scenario())] == [
+        ("10:00 AM", 1), ("11:00 AM", 1), ("11:30 AM", 1),
+    ]
+
+
+def test_units_above_one_skip_partly_booked_slots(db):
+    bookings = [booking(game_type="meta_quest_vr"),
+                booking(game_type="meta_quest_vr", time_slot="10:00 AM", day=NEXT_DAY),
+                booking(game_type="meta_quest_vr", time_slot="11:00 AM", duration=30, day=NEXT_DAY)]
+    options = search(db, bookings, datetime(2031, 1, 6, 10, 0), game_types=("meta_quest_vr",),
+                     horizon_days=2, limit=50, units=2)
+
+    assert options[0] == ("2031-01-06", "11:00 AM", "meta_quest_vr", 2)
+    next_day = [time for day, time, _, _ in options if day == "2031-01-07"]
+    # Both headsets are only free together from 11:30 on the second day
+    assert next_day[:2] == ["11:30 AM", "12:00 PM"]
+    # Every hour-long start from 11:00 and from 11:30 to 8:00 PM, below the limit
+    assert len(options) == 19 + 18
+
+
+def test_invalid_search_is_rejected(db):
+    with pytest.raises(ValueError):
+        search(db, [], datetime(2031, 1, 6, 10, 0), units=0)
@@ -0,0 +1,152 @@
+import asyncio
+from datetime import date, datetime
+
+import pytest
+
+from capacity import CapacityError
+from services import AvailabilityService, BookingService
+from slots import SLOT_INDEX
+from stations import StationAssigner, StationSchedule
+
+DAY = date(2031, 1, 6)
+
+
+def booking(game_type="meta_quest_vr", time_slot="10:00 AM", duration=60):
+    return dict(name="Test", phone="9999999999", game_type=game_type, time_slot=time_slot,
+                duration=duration, date=DAY.isoformat())
+
+
+async def claims(db):
+    """{booking_id: (station, number of claimed slots)}"""
+    held = {}
+    async for claim in db.station_slots.find({}):
+        station, count = held.get(claim["booking_id"], (claim["station"], 0))
+        held[claim["booking_id"]] = (station, count + 1)
+    return held
+
+
+async def counters(db):
+    """Units held per (game_type, slot_minute), ignoring counters back at zero"""
+    return {(doc["game_type"], doc["slot_minute"]): doc["count"]
+            async for doc in db.slot_counters.find({"count": {"$gt": 0}})}
+
+
+async def fragment(service):
+    """Leave headset 1 busy 10:00-11:00 and headset 2 busy 11:00-12:00"""
+    await service.create_booking(booking())
+    filler = await service.create_booking(booking(time_slot="11:00 AM", duration=30))
+    late = await service.create_booking(booking(time_slot="11:00 AM"))
+    await service.update_booking(filler.id, {"status": "cancelled"})
+    assert late.station == 2
+
+
+def test_best_fit_picks_the_tightest_gap():
+    schedule = StationSchedule(3, num_slots=20)
+    schedule.add(1, 0, 4)
+    schedule.add(1, 6, 20)
+    schedule.add(2, 0, 4)
+
+    # Only station 1 leaves no idle time around [4, 6)
+    assert schedule.best_fit(4, 6) == 1
+    # Station 1 is busy from 6; station 2 leaves 12 idle slots, station 3 leaves 16
+    assert schedule.best_fit(4, 8) == 2
+    assert schedule.best_fit(4, 8, exclude=[2]) == 3
+    # Ties go to the lowest station
+    assert StationSchedule(3, num_slots=20).best_fit(0, 2) == 1
+
+
+def test_free_counts_need_one_station_for_the_whole_window():
+    schedule = StationSchedule(2, num_slots=6)
+    schedule.add(1, 0, 2)
+    schedule.add(2, 2, 4)
+
+    assert schedule.free_counts(1).tolist() == [1, 1, 1, 1, 2, 2]
+    # From slot 1 each station is busy somewhere in the next two slots
+    assert schedule.free_counts(2).tolist() == [1, 0, 1, 1, 2, 2]
+
+
+def test_fragmented_day_reports_the_slot_unavailable(db):
+    async def scenario():
+        service = BookingService(db)
+        availability = AvailabilityService(service)
+        await fragment(service)
+
+        day = datetime.combine(DAY, datetime.min.time())
+        slot = (await availability.get_availability(day, "meta_quest_vr", 60)).time_slots[SLOT_INDEX["10:30 AM"]]
+        check = await availability.check_capacity_for_slot(day, "10:30 AM", "meta_quest_vr", 60)
+        return slot, check
+
+    slot, check = asyncio.run(scenario())
+    # One headset is free at 10:30 and one at 11:00, but neither for the whole hour
+    assert (slot.available, slot.booked) == (False, 1)
+    assert check == {"available": False, "booked": 1, "capacity": 2}
+
+
+def test_failed_station_claim_rolls_back_claims_and_counters(db):
+    async def scenario():
+        service = BookingService(db)
+        await fragment(service)
+        claims_before, counters_before = await claims(db), await counters(db)
+
+        with pytest.raises(CapacityError, match="No single meta_quest_vr station"):
+            await service.create_booking(booking(time_slot="10:30 AM"))
+        # The xbox item is claimed before the headset fails, and must be given back
+        with pytest.raises(CapacityError):
+            await service.create_booking_group([booking(game_type="xbox", time_slot="02:00 PM"),
+                                                booking(time_slot="10:30 AM")])
+
+        assert await claims(db) == claims_before
+        assert await counters(db) == counters_before
+        return await db.bookings.count_documents({"status": {"$ne": "cancelled"}})
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_cancel_delete_and_bulk_cancel_release_claims(db):
+    async def scenario():
+        service = BookingService(db)
+        cancelled = await service.create_booking(booking(game_type="xbox"))
+        deleted = await service.create_booking(booking(game_type="xbox", time_slot="12:00 PM"))
+        bulk = await service.create_booking(booking(game_type="xbox", time_slot="02:00 PM", duration=90))
+        assert await claims(db) == {cancelled.id: (1, 2), deleted.id: (1, 2), bulk.id: (1, 3)}
+
+        await service.update_booking(cancelled.id, {"status": "cancelled"})
+        await service.delete_booking(deleted.id)
+        await service.bulk_update_status("cancelled", ids=[bulk.id])
+        assert await claims(db) == {}
+
+        # Reactivating claims a station again
+        reactivated = await service.update_booking(cancelled.id, {"status": "confirmed"})
+        await service.bulk_update_status("confirmed", ids=[bulk.id])
+        return reactivated, bulk.id, await claims(db)
+
+    reactivated, bulk_id, held = asyncio.run(scenario())
+    assert reactivated.station == 1
+    assert held == {reactivated.id: (1, 2), bulk_id: (1, 3)}
+
+
+def test_colliding_claim_retries_on_another_station(db):
+    async def scenario():
+        assigner = StationAssigner(db)
+        start = SLOT_INDEX["12:00 PM"]
+        # Another booking takes headset 1 at 12:30 after this one loaded its schedule
+        await db.station_slots.insert_one(
+            assigner._claim_docs(DAY, "meta_quest_vr", 1, (start + 1, start + 2), "other")[0]
+        )
+        fresh_schedule = assigner.load_schedule
+        loads = []
+
+        async def load_schedule(booking_date, game_type):
+            loads.append(game_type)
+            if len(loads) == 1:
+                return StationSchedule(2)
+            return await fresh_schedule(booking_date, game_type)
+
+        assigner.load_schedule = load_schedule
+        stations = await assigner.assign(DAY, "meta_quest_vr", [(start, start + 2)], ["mine"])
+        return stations, len(loads), await claims(db)
+
+    stations, loads, held = asyncio.run(scenario())
+    assert (stations, loads) == ([2], 2)
+    # The 12:00 claim on headset 1 that went in before the collision was undone
+    assert held == {"other": (1, 1), "mine": (2, 2)}
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import date
+
+from services import BookingService
+
+DAY = date(2031, 1, 6)
+NEXT_DAY = date(2031, 1, 7)
+
+
+def booking(game_type="playstation", time_slot="10:00 AM", duration=60, day=DAY, num_people=1):
+    return dict(name="Test", phone="9999999999", game_type=game_type, time_slot=time_slot,
+                duration=duration, date=day.isoformat(), num_people=num_people)
+
+
+def test_rollups_match_a_rebuild_after_mixed_writes(db):
+    async def scenario():
+        service = BookingService(db)
+        kept = await service.create_booking(booking(duration=90, num_people=2))
+        cancelled = await service.create_booking(booking(game_type="xbox"))
+        by_reference = await service.create_booking(booking(time_slot="01:00 PM"))
+        reactivated = await service.create_booking(booking(game_type="board_games", day=NEXT_DAY))
+        deleted_active = await service.create_booking(booking(time_slot="03:00 PM"))
+        deleted_cancelled = await service.create_booking(booking(game_type="nintendo", day=NEXT_DAY))
+        _, group = await service.create_booking_group([
+            booking(game_type="meta_quest_vr", duration=120),
+            booking(game_type="board_games", time_slot="05:00 PM", day=NEXT_DAY),
+        ])
+
+        await service.update_booking(kept.id, {"status": "confirmed"})
+        await service.update_booking(cancelled.id, {"status": "cancelled"})
+        await service.cancel_booking_by_reference(by_reference.reference_number)
+        await service.update_booking(reactivated.id, {"status": "cancelled"})
+        await service.update_booking(reactivated.id, {"status": "confirmed"})
+        await service.delete_booking(deleted_active.id)
+        await service.update_booking(deleted_cancelled.id, {"status": "cancelled"})
+        await service.delete_booking(deleted_cancelled.id)
+        await service.bulk_update_status("cancelled", ids=[item.id for item in group])
+        await service.bulk_update_status("pending", ids=[group[1].id])
+
+        # What /api/stats/daily serves, before and after `migrations.py rebuild-stats`
+        maintained = await service.daily_stats.daily(DAY, NEXT_DAY)
+        await service.daily_stats.rebuild(db.bookings, DAY)
+        rebuilt = await service.daily_stats.daily(DAY, NEXT_DAY)
+        return maintained, rebuilt
+
+    maintained, rebuilt = asyncio.run(scenario())
+    assert maintained == rebuilt
+    assert sum(row["active_bookings"] for row in rebuilt) == 3
+    assert sum(row["cancelled_bookings"] for row in rebuilt) == 3